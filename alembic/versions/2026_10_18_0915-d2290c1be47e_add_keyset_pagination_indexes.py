@@ -0,0 +1,50 @@
+"""Add keyset pagination indexes
+
+Revision ID: d2290c1be47e
+Revises: 1b811717145c
+Create Date: 2026-10-18 09:15:42.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2290c1be47e'
+down_revision: Union[str, None] = '1b811717145c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (sort column, id) pairs used by the cursor pagination of GET /users
+KEYSET_INDEXES = {
+    'ix_user_created_at_id': ['created_at', 'id'],
+    'ix_user_updated_at_id': ['updated_at', 'id'],
+    'ix_user_first_name_id': ['first_name', 'id'],
+    'ix_user_last_name_id': ['last_name', 'id'],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for index_name, columns in KEYSET_INDEXES.items():
+            op.create_index(
+                index_name,
+                'user',
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in KEYSET_INDEXES:
+            op.drop_index(
+                index_name,
+                table_name='user',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,81 @@
+"""Add user search indexes
+
+Revision ID: e44d38da2bee
+Revises: d2290c1be47e
+Create Date: 2026-10-18 10:30:07.552191
+
+Adding the stored search_vector column rewrites the user table under an
+ACCESS EXCLUSIVE lock, so run this revision in a maintenance window on
+large tables. The GIN indexes themselves are built concurrently.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e44d38da2bee'
+down_revision: Union[str, None] = 'd2290c1be47e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCHABLE_COLUMNS = ['first_name', 'last_name', 'email', 'phone_number']
+
+SEARCH_VECTOR_EXPRESSION = (
+    "to_tsvector('simple', "
+    + " || ' ' || ".join(f"coalesce({column}, '')" for column in SEARCHABLE_COLUMNS)
+    + ")"
+)
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column(
+        'user',
+        sa.Column(
+            'search_vector',
+            TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        ),
+    )
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_search_vector',
+            'user',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for column in SEARCHABLE_COLUMNS:
+            op.create_index(
+                f'ix_user_{column}_trgm',
+                'user',
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in SEARCHABLE_COLUMNS:
+            op.drop_index(
+                f'ix_user_{column}_trgm',
+                table_name='user',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+        op.drop_index(
+            'ix_user_search_vector',
+            table_name='user',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('user', 'search_vector')
@@ -0,0 +1,76 @@
+"""Throughput of the user creation paths.
+
+Creates users one by one through `UserService.create_user_details`, one session
+and transaction each as POST /users does, then through
+`UserService.create_users_bulk` as POST /users/bulk does, on a scratch schema of
+the configured database.
+
+    python -m benchmarks.bulk_create --users 10000 --single-users 1000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import scratch_engine
+from src.dto.user import UserCreate
+from src.service.user_service import user_service
+
+
+def user_payload(number: int):
+    return {
+        "firstName": f"first{number}",
+        "lastName": f"last{number}",
+        "gender": 1 + number % 4,
+        "email": f"bulk{number}@example.com",
+        "phoneNumber": f"+1{number:010d}",
+    }
+
+
+async def create_one_by_one(engine, count: int):
+    started = time.perf_counter()
+    for number in range(count):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await user_service.create_user_details(
+                UserCreate.model_validate(user_payload(number)), db_obj=session
+            )
+    return time.perf_counter() - started
+
+
+async def create_in_bulk(engine, count: int, batch: int):
+    started = time.perf_counter()
+    for start in range(0, count, batch):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await user_service.create_users_bulk(
+                [
+                    user_payload(number)
+                    for number in range(start, min(count, start + batch))
+                ],
+                db_obj=session,
+            )
+    return time.perf_counter() - started
+
+
+async def run(users: int, single_users: int, batch: int):
+    async with scratch_engine() as engine:
+        print(f"{'path':>12} {'users':>8} {'seconds':>9} {'users/s':>10}")
+        elapsed = await create_one_by_one(engine, single_users)
+        print(
+            f"{'one by one':>12} {single_users:>8} {elapsed:>9.2f} "
+            f"{single_users / elapsed:>10.0f}"
+        )
+        elapsed = await create_in_bulk(engine, users, batch)
+        print(f"{'bulk':>12} {users:>8} {elapsed:>9.2f} {users / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--single-users", type=int, default=1_000)
+    parser.add_argument(
+        "--batch", type=int, default=5_000, help="users per bulk request"
+    )
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.users, arguments.single_users, arguments.batch))
@@ -0,0 +1,114 @@
+"""Shared helpers of the benchmark scripts.
+
+The benchmarks run against the database configured in `src.core.config.Settings`
+but only ever touch a scratch schema that is dropped once they finish."""
+
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.dao.db import SQLALCHEMY_DATABASE_URL
+from src.dao.models.user import Base
+
+BENCHMARK_SCHEMA = "benchmark"
+
+FIRST_NAMES = [
+    "james", "mary", "robert", "patricia", "john", "jennifer", "michael", "linda",
+    "david", "elizabeth", "william", "barbara", "richard", "susan", "joseph",
+    "jessica", "thomas", "sarah", "charles", "karen",
+]  # fmt: skip
+
+LAST_NAMES = [
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis",
+    "rodriguez", "martinez", "hernandez", "lopez", "gonzalez", "wilson",
+    "anderson", "thomas", "taylor", "moore", "jackson", "martin",
+]  # fmt: skip
+
+
+@asynccontextmanager
+async def scratch_engine(schema: str = BENCHMARK_SCHEMA, **engine_kwargs):
+    """
+    Async engine bound to a freshly created scratch schema holding the tables.
+
+    Args:
+        schema (str): Name of the scratch schema, dropped on exit.
+        **engine_kwargs: Extra arguments for `create_async_engine`.
+
+    Yields:
+        AsyncEngine: Engine whose search_path points at the scratch schema.
+    """
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"server_settings": {"search_path": f"{schema}, public"}},
+        **engine_kwargs,
+    )
+    async with engine.begin() as connection:
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {schema}"))
+        # tables of other schemas on the search_path must not be mistaken for ours
+        await connection.run_sync(Base.metadata.create_all, checkfirst=False)
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await engine.dispose()
+
+
+async def seed_users(engine, start: int, stop: int):
+    """
+    Insert synthetic users numbered [start, stop) server side, then refresh the planner statistics.
+
+    Args:
+        engine (AsyncEngine): Engine of the scratch schema.
+        start (int): Number of the first user to insert.
+        stop (int): Number after the last user to insert.
+    """
+    if stop <= start:
+        return
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(
+                """
+                INSERT INTO "user"
+                    (id, first_name, last_name, gender, email, phone_number, status)
+                SELECT
+                    gen_random_uuid(),
+                    (CAST(:first_names AS text[]))[1 + i % :first_name_count],
+                    (CAST(:last_names AS text[]))[1 + (i / 7) % :last_name_count] || (i % 997),
+                    1 + i % 4,
+                    'user' || i || '@example.com',
+                    '+1' || lpad((i * 7919 % 10000000000)::text, 10, '0'),
+                    i % 3
+                FROM generate_series(:start, :stop - 1) AS i
+                """
+            ),
+            {
+                "first_names": FIRST_NAMES,
+                "last_names": LAST_NAMES,
+                "first_name_count": len(FIRST_NAMES),
+                "last_name_count": len(LAST_NAMES),
+                "start": start,
+                "stop": stop,
+            },
+        )
+        await connection.execute(text('ANALYZE "user"'))
+
+
+def percentile(samples: list, pct: float):
+    """
+    Nearest-rank percentile of the samples.
+
+    Args:
+        samples (list): Measured values.
+        pct (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile value, 0 for no samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
@@ -0,0 +1,172 @@
+"""Microbenchmarks of the per-request DTO validation and conversion paths.
+
+Times the validation of the request bodies by `UserCreate`, `UserUpdate` and
+`UserUpdateStatus`, the building of `UserResponse` DTOs and the `Converter`
+functions, at the payload sizes of the API. Each case reports operations per
+second, best of the repetitions, and the tracemalloc peak of a single
+operation. No database is needed.
+
+Every run is appended to benchmarks/results/dto_microbench.json with the commit
+it ran on, and compared with the previous run of the history.
+
+    python -m benchmarks.dto_microbench --label "cache alias generator"
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import timeit
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.common import FIRST_NAMES, LAST_NAMES
+from benchmarks.serialization import make_users
+from src.dto.user import UserCreate, UserResponse, UserUpdate, UserUpdateStatus
+from src.service.converter import USER_RESPONSE_ALIASES, Converter
+
+DEFAULT_HISTORY = Path(__file__).parent / "results" / "dto_microbench.json"
+
+# Stand-in of the Core rows of UserDAO.all_user, which expose _fields like a namedtuple
+UserRow = namedtuple("UserRow", [name for name, _ in USER_RESPONSE_ALIASES])
+
+
+def create_body(number: int):
+    """A POST /users body, decoded from JSON as FastAPI hands it to the model"""
+    return {
+        "firstName": FIRST_NAMES[number % len(FIRST_NAMES)],
+        "lastName": LAST_NAMES[number % len(LAST_NAMES)],
+        "gender": 1 + number % 4,
+        "email": f"user{number}@example.com",
+        "phoneNumber": f"+1{number:010d}",
+    }
+
+
+def cases():
+    """The benchmarked operations by name, each a function without arguments"""
+    create = create_body(1)
+    bulk = [create_body(number) for number in range(1000)]
+    update = {"lastName": "smith", "email": "renamed@example.com"}
+    user_create = UserCreate.model_validate(create)
+    user_update = UserUpdate.model_validate(update)
+    user, *_ = users = make_users(100)
+    dtos = [Converter.user_db_to_dto(row) for row in users]
+    rows = [UserRow(*(getattr(row, name) for name in UserRow._fields)) for row in users]
+    return {
+        "UserCreate.model_validate": lambda: UserCreate.model_validate(create),
+        "UserCreate.model_validate x1000 (bulk)": lambda: [
+            UserCreate.model_validate(body) for body in bulk
+        ],
+        "UserUpdate.model_validate": lambda: UserUpdate.model_validate(update),
+        "UserUpdateStatus.model_validate": lambda: UserUpdateStatus.model_validate(
+            {"status": 1}
+        ),
+        "UserUpdate.model_dump(exclude_unset)": lambda: user_update.model_dump(
+            exclude_unset=True
+        ),
+        "Converter.user_create_dto_to_dict": lambda: Converter.user_create_dto_to_dict(
+            user_create
+        ),
+        "Converter.user_update_dto_to_db": lambda: Converter.user_update_dto_to_db(
+            user_update, user
+        ),
+        "UserResponse.model_validate(from_attributes)": lambda: UserResponse.model_validate(
+            user, from_attributes=True
+        ),
+        "Converter.user_db_to_dto": lambda: Converter.user_db_to_dto(user),
+        "Converter.user_rows_to_dtos x100": lambda: Converter.user_rows_to_dtos(rows),
+        "Converter.users_to_json x1": lambda: Converter.users_to_json(dtos[0]),
+        "Converter.users_to_json x100": lambda: Converter.users_to_json(dtos),
+        "Converter.parse_fields": lambda: Converter.parse_fields(
+            "id,firstName,lastName,status"
+        ),
+    }
+
+
+def measure(operation, repeat: int):
+    """Operations per second, best of the repetitions, and the peak bytes of one call"""
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+
+    tracemalloc.start()
+    result = operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"ops_per_sec": round(number / best, 1), "peak_bytes": peak}
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: Path):
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def run(arguments):
+    history_path = Path(arguments.history)
+    history = load_history(history_path)
+    previous = history[-1]["results"] if history else {}
+
+    print(f"{'case':<45} {'ops/s':>12} {'us/op':>9} {'peak B':>9} {'vs previous':>12}")
+    results = {}
+    for name, operation in cases().items():
+        if arguments.filter and arguments.filter not in name:
+            continue
+        result = results[name] = measure(operation, arguments.repeat)
+        before = previous.get(name)
+        change = (
+            f"{(result['ops_per_sec'] / before['ops_per_sec'] - 1) * 100:+.1f}%"
+            if before
+            else "new"
+        )
+        print(
+            f"{name:<45} {result['ops_per_sec']:>12,.0f} "
+            f"{1e6 / result['ops_per_sec']:>9.2f} {result['peak_bytes']:>9} "
+            f"{change:>12}"
+        )
+
+    if arguments.no_save:
+        return
+    history.append(
+        {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit(),
+            "label": arguments.label,
+            "python": platform.python_version(),
+            "results": results,
+        }
+    )
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    history_path.write_text(json.dumps(history, indent=2) + "\n")
+    print(f"results appended to {history_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timed repetitions, the best one counts"
+    )
+    parser.add_argument("--filter", help="only run the cases whose name contains it")
+    parser.add_argument("--label", help="description of the change being measured")
+    parser.add_argument(
+        "--history", default=str(DEFAULT_HISTORY), help="JSON history of the runs"
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="do not append the run to the history"
+    )
+    run(parser.parse_args())
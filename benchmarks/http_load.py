@@ -0,0 +1,340 @@
+"""HTTP load test of the /users endpoints.
+
+Drives the real FastAPI `app` with a mixed workload of get, list, search,
+create, patch, status and delete requests at a given concurrency, and reports
+the throughput, the p50/p95/p99 latency and the database statements per request
+read from the Server-Timing header. By default the app runs in-process through
+an ASGI transport, with its sessions bound to a scratch schema of the configured
+database. With --base-url the requests go to a running server instead, e.g.
+`uvicorn main:app`, which must point at a disposable database: the users of the
+run are created and deleted through the API.
+
+The results are compared with a stored baseline, the run exits with status 1
+when the throughput drops, a p95 latency grows past the tolerance or a request
+runs more statements than before. --update-baseline stores the results instead.
+
+    python -m benchmarks.http_load --requests 2000 --concurrency 20
+    python -m benchmarks.http_load --base-url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import FIRST_NAMES, LAST_NAMES, percentile, scratch_engine
+from main import app
+from src.core.config import settings
+from src.dao.db import get_db, get_read_db
+from src.dao.instrumentation import instrument_engine
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "http_load.json"
+
+# Share of each operation in the workload
+WORKLOAD = {
+    "get": 35,
+    "list": 20,
+    "search": 10,
+    "create": 10,
+    "patch": 10,
+    "status": 10,
+    "delete": 5,
+}
+
+STATEMENTS = re.compile(r'db;[^,]*desc="(\d+) statements"')
+
+
+class LoadTest:
+    """Workload state shared by the concurrent clients"""
+
+    def __init__(self, client: httpx.AsyncClient, user_ids: list, seed: int):
+        self.client = client
+        self.user_ids = user_ids
+        self.created_ids = []
+        self.random = random.Random(seed)
+        self.samples = {operation: [] for operation in WORKLOAD}
+        self.statements = {operation: [] for operation in WORKLOAD}
+        self.errors = {operation: 0 for operation in WORKLOAD}
+
+    def new_user(self):
+        return {
+            "firstName": self.random.choice(FIRST_NAMES),
+            "lastName": self.random.choice(LAST_NAMES),
+            "gender": self.random.randint(1, 4),
+            "email": f"load-{uuid.uuid4().hex}@example.com",
+        }
+
+    def request(self, operation: str):
+        """The method, url and body of one request of an operation"""
+        user_id = self.random.choice(self.user_ids)
+        if operation == "get":
+            return "GET", f"/users/{user_id}", None
+        if operation == "list":
+            offset = self.random.randrange(0, len(self.user_ids), 20)
+            return "GET", f"/users?limit=20&offset={offset}", None
+        if operation == "search":
+            search = self.random.choice(FIRST_NAMES)[:3]
+            return "GET", f"/users?limit=20&search={search}", None
+        if operation == "create":
+            return "POST", "/users", self.new_user()
+        if operation == "patch":
+            body = {"lastName": self.random.choice(LAST_NAMES)}
+            return "PATCH", f"/users/{user_id}", body
+        if operation == "status":
+            body = {"status": self.random.randint(0, 2)}
+            return "PATCH", f"/users/{user_id}/status", body
+        # only the users created by the run are deleted, the others stay readable
+        return "DELETE", f"/users/{self.created_ids.pop()}", None
+
+    def next_operation(self):
+        operation = self.random.choices(
+            list(WORKLOAD), weights=list(WORKLOAD.values())
+        )[0]
+        if operation == "delete" and not self.created_ids:
+            return "create"
+        return operation
+
+    async def send(self, operation: str, record: bool = True):
+        method, url, body = self.request(operation)
+        started = time.perf_counter()
+        response = await self.client.request(method, url, json=body)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            self.errors[operation] += 1
+        elif operation == "create":
+            self.created_ids.append(response.json()["id"])
+        if record:
+            self.samples[operation].append(elapsed)
+            match = STATEMENTS.search(response.headers.get("server-timing", ""))
+            if match:
+                self.statements[operation].append(int(match.group(1)))
+
+    async def run(self, requests: int, concurrency: int, warmup: int):
+        for _ in range(warmup):
+            await self.send(self.next_operation(), record=False)
+
+        remaining = iter(range(requests))
+
+        async def client_loop():
+            for _ in remaining:
+                await self.send(self.next_operation())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+def summarize(load_test: LoadTest, requests_per_second: float):
+    operations = {}
+    for operation, samples in load_test.samples.items():
+        if not samples:
+            continue
+        statements = load_test.statements[operation]
+        operations[operation] = {
+            "requests": len(samples),
+            "errors": load_test.errors[operation],
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "statements_per_request": (
+                round(sum(statements) / len(statements), 2) if statements else None
+            ),
+        }
+    return {
+        "requests_per_second": round(requests_per_second, 1),
+        "operations": operations,
+    }
+
+
+def report(results: dict):
+    print(
+        f"{'operation':>10} {'requests':>9} {'errors':>7} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'statements':>11}"
+    )
+    for operation, result in results["operations"].items():
+        statements = result["statements_per_request"]
+        print(
+            f"{operation:>10} {result['requests']:>9} {result['errors']:>7} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} "
+            f"{'n/a' if statements is None else f'{statements:.2f}':>11}"
+        )
+    print(f"throughput: {results['requests_per_second']:.1f} requests/s")
+
+
+def regressions(
+    results: dict, baseline: dict, tolerance: float, statement_tolerance: float
+):
+    """The results worse than the baseline, as readable messages"""
+    found = []
+    if results["requests_per_second"] < baseline["requests_per_second"] * (
+        1 - tolerance
+    ):
+        found.append(
+            f"throughput {results['requests_per_second']} requests/s, "
+            f"baseline {baseline['requests_per_second']}"
+        )
+    for operation, result in results["operations"].items():
+        if result["errors"]:
+            found.append(f"{operation}: {result['errors']} failed requests")
+        expected = baseline["operations"].get(operation)
+        if expected is None:
+            continue
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            found.append(
+                f"{operation}: p95 {result['p95_ms']}ms, baseline {expected['p95_ms']}ms"
+            )
+        statements = result["statements_per_request"]
+        if (
+            statements is not None
+            and expected["statements_per_request"] is not None
+            and statements > expected["statements_per_request"] + statement_tolerance
+        ):
+            found.append(
+                f"{operation}: {statements} statements per request, "
+                f"baseline {expected['statements_per_request']}"
+            )
+    return found
+
+
+async def seed(client: httpx.AsyncClient, users: int, seed_value: int):
+    """Creates the users of the run through the API, returns their IDs"""
+    generator = LoadTest(client, [], seed_value)
+    user_ids = []
+    for start in range(0, users, 1000):
+        batch = [generator.new_user() for _ in range(min(1000, users - start))]
+        response = await client.post("/users/bulk", json=batch)
+        response.raise_for_status()
+        user_ids.extend(user["id"] for user in response.json()["created"])
+    return user_ids
+
+
+async def drive(client: httpx.AsyncClient, arguments, cleanup: bool):
+    user_ids = await seed(client, arguments.users, arguments.seed)
+    load_test = LoadTest(client, user_ids, arguments.seed)
+    try:
+        requests_per_second = await load_test.run(
+            arguments.requests, arguments.concurrency, arguments.warmup
+        )
+    finally:
+        if cleanup:
+            limiter = asyncio.Semaphore(arguments.concurrency)
+
+            async def delete(user_id):
+                async with limiter:
+                    await client.delete(f"/users/{user_id}")
+
+            await asyncio.gather(
+                *(delete(user_id) for user_id in user_ids + load_test.created_ids)
+            )
+    return summarize(load_test, requests_per_second)
+
+
+async def run_in_process(arguments):
+    async with scratch_engine(
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    ) as engine:
+        # the statements reach the Server-Timing header through the engine events
+        instrument_engine("benchmark", engine)
+        scratch_session = sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async def get_scratch_db():
+            async with scratch_session() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = get_scratch_db
+        app.dependency_overrides[get_read_db] = get_scratch_db
+        try:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://load-test"
+            ) as client:
+                return await drive(client, arguments, cleanup=False)
+        finally:
+            app.dependency_overrides.clear()
+
+
+async def run_against_server(arguments):
+    limits = httpx.Limits(max_connections=arguments.concurrency)
+    async with httpx.AsyncClient(
+        base_url=arguments.base_url, limits=limits, timeout=60
+    ) as client:
+        return await drive(client, arguments, cleanup=True)
+
+
+def main(arguments):
+    if arguments.base_url:
+        results = asyncio.run(run_against_server(arguments))
+    else:
+        results = asyncio.run(run_in_process(arguments))
+    report(results)
+
+    baseline_path = Path(arguments.baseline)
+    if arguments.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}, run with --update-baseline")
+        return 0
+
+    found = regressions(
+        results,
+        json.loads(baseline_path.read_text()),
+        arguments.tolerance,
+        arguments.statement_tolerance,
+    )
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--base-url", help="url of a running server, the app runs in-process otherwise"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="measured requests in total"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="requests in flight at once"
+    )
+    parser.add_argument("--users", type=int, default=1000, help="users seeded first")
+    parser.add_argument(
+        "--warmup", type=int, default=100, help="requests sent before measuring"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the workload")
+    parser.add_argument(
+        "--baseline", default=str(DEFAULT_BASELINE), help="baseline JSON file"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative drop of throughput and growth of p95 latency",
+    )
+    parser.add_argument(
+        "--statement-tolerance",
+        type=float,
+        default=0.5,
+        help="allowed growth of the average statements per request",
+    )
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Latency and memory of the user listing read path.
+
+Compares loading a page as tracked ORM `User` instances converted one by one,
+as `UserDAO.all_user` and `UserService.get_all_users` used to, with the Core
+rows of `UserDAO.all_user` converted by `Converter.user_rows_to_dtos`, on a
+scratch schema of the configured database. Memory is the tracemalloc peak of
+loading and converting one page, measured in separate runs.
+
+    python -m benchmarks.list_read_path --limits 100 1000 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import percentile, scratch_engine, seed_users
+from src.dao.models.user import User
+from src.dao.users import UserDAO
+from src.service.converter import Converter
+
+
+async def orm_page(session: AsyncSession, limit: int):
+    """The former read path, ORM instances converted one by one"""
+    result = await session.execute(
+        select(User).order_by(User.created_at.asc(), User.id.asc()).limit(limit + 1)
+    )
+    users = result.scalars().all()[:limit]
+    return [Converter.user_db_to_dto(user) for user in users]
+
+
+async def core_page(session: AsyncSession, limit: int):
+    users, _ = await UserDAO.all_user(db_obj=session, limit=limit)
+    return Converter.user_rows_to_dtos(users)
+
+
+async def measure(engine, read_page, limit: int, runs: int):
+    samples = []
+    for _ in range(runs):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            await read_page(session, limit)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    async with AsyncSession(engine) as session:
+        # the connection is opened first so that the pool does not count
+        await session.connection()
+        tracemalloc.start()
+        page = await read_page(session, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del page
+    return samples, peak
+
+
+async def run(limits: list, runs: int):
+    async with scratch_engine() as engine:
+        await seed_users(engine, 0, max(limits) + 1)
+        print(
+            f"{'limit':>7} {'read path':>10} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'peak KiB':>10} {'bytes/user':>11}"
+        )
+        for limit in limits:
+            for name, read_page in (("orm", orm_page), ("core rows", core_page)):
+                # warm up the compiled statement caches
+                async with AsyncSession(engine) as session:
+                    await read_page(session, limit)
+                samples, peak = await measure(engine, read_page, limit, runs)
+                print(
+                    f"{limit:>7} {name:>10} {percentile(samples, 50):>9.2f} "
+                    f"{percentile(samples, 95):>9.2f} {peak / 1024:>10.0f} "
+                    f"{peak / limit:>11.0f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--limits", type=int, nargs="+", default=[100, 1000, 10000], help="page sizes"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=20, help="timed reads of every page size"
+    )
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.limits, arguments.runs))
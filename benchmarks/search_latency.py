@@ -0,0 +1,103 @@
+"""Latency of the GET /users search against the size of the user table.
+
+Compares the former leading-wildcard ILIKE predicate with the index backed one of
+`UserDAO.all_user`, for growing table sizes, on a scratch schema of the configured
+database (pg_trgm must be available).
+
+    python -m benchmarks.search_latency --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import String, cast, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import percentile, scratch_engine, seed_users
+from src.dao.models.user import User
+from src.dao.users import UserDAO
+
+SEARCH_TERMS = ["smith", "mary", "user4242", "example.com", "7919", "jo", "john smi"]
+
+
+def legacy_search_query(search: str):
+    """The search predicate as it was before the indexes, for comparison."""
+    pattern = f"%{search}%"
+    return (
+        select(User)
+        .where(
+            or_(
+                cast(User.gender, String).ilike(pattern),
+                User.email.ilike(pattern),
+                User.first_name.ilike(pattern),
+                User.last_name.ilike(pattern),
+                User.phone_number.ilike(pattern),
+                cast(User.status, String).ilike(pattern),
+            )
+        )
+        .order_by(User.created_at.asc())
+        .limit(10)
+    )
+
+
+async def time_legacy(session: AsyncSession, search: str):
+    started = time.perf_counter()
+    result = await session.execute(legacy_search_query(search))
+    result.scalars().all()
+    return time.perf_counter() - started
+
+
+async def time_indexed(session: AsyncSession, search: str, sort_by: str):
+    started = time.perf_counter()
+    await UserDAO.all_user(db_obj=session, search=search, sort_by=sort_by, limit=10)
+    return time.perf_counter() - started
+
+
+async def indexed_plan(session: AsyncSession, search: str):
+    """Top nodes of the plan of the indexed search, to check the indexes are used."""
+    query = select(User.id).where(UserDAO.search_condition(search))
+    compiled = query.compile(dialect=session.bind.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN {compiled}", parameters)
+    return " / ".join(line.strip() for line in result.scalars().all() if "Scan" in line)
+
+
+async def run(sizes: list, runs: int):
+    async with scratch_engine() as engine:
+        seeded = 0
+        print(f"{'rows':>10} {'variant':>18} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for size in sorted(sizes):
+            await seed_users(engine, seeded, size)
+            seeded = size
+            async with AsyncSession(engine) as session:
+                variants = {
+                    "legacy ilike": lambda term: time_legacy(session, term),
+                    "indexed": lambda term: time_indexed(session, term, "created_at"),
+                    "indexed+relevance": lambda term: time_indexed(
+                        session, term, "relevance"
+                    ),
+                }
+                for name, measure in variants.items():
+                    samples = []
+                    for _ in range(runs):
+                        for term in SEARCH_TERMS:
+                            samples.append(await measure(term) * 1000)
+                    print(
+                        f"{size:>10} {name:>18} {percentile(samples, 50):>9.2f} "
+                        f"{percentile(samples, 95):>9.2f} {max(samples):>9.2f}"
+                    )
+                print(f"{'':>10} plan: {await indexed_plan(session, 'smith')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="repetitions of every search term"
+    )
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.sizes, arguments.runs))
@@ -0,0 +1,117 @@
+"""Cost of turning user rows into a JSON response body.
+
+Compares the response_model path, which copies every row into another `User`
+and lets FastAPI validate and encode it as `UserResponse`, with the fast path of
+`Converter.user_db_to_dto` and `Converter.users_to_json`, for payloads of 1, 100
+and 10k users. No database is needed, the rows are built in memory.
+
+    python -m benchmarks.serialization --sizes 1 100 10000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from benchmarks.common import FIRST_NAMES, LAST_NAMES
+from src.dao.models.user import User
+from src.dto.user import UserResponse
+from src.service.converter import Converter
+
+RESPONSE_FIELD = create_model_field(
+    name="Response", type_=List[UserResponse], mode="serialization"
+)
+
+
+def make_users(count: int):
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        User(
+            id=uuid.uuid4(),
+            first_name=FIRST_NAMES[number % len(FIRST_NAMES)],
+            last_name=LAST_NAMES[number % len(LAST_NAMES)],
+            gender=1 + number % 4,
+            email=f"user{number}@example.com",
+            phone_number=f"+1{number:010d}",
+            status=1,
+            created_at=created_at + timedelta(seconds=number),
+            updated_at=created_at + timedelta(seconds=number, microseconds=number),
+        )
+        for number in range(count)
+    ]
+
+
+def legacy_user_db_to_dto(user: User):
+    """The former converter, copying the row into a new User"""
+    return User(
+        id=user.id,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        gender=user.gender,
+        email=user.email,
+        phone_number=user.phone_number,
+        status=user.status,
+        created_at=user.created_at,
+        updated_at=user.updated_at,
+    )
+
+
+async def response_model_body(users: List[User]):
+    content = await serialize_response(
+        field=RESPONSE_FIELD,
+        response_content=[legacy_user_db_to_dto(user) for user in users],
+    )
+    return JSONResponse(content).body
+
+
+async def fast_body(users: List[User]):
+    return Converter.users_to_json([Converter.user_db_to_dto(user) for user in users])
+
+
+async def measure(serializer, users: List[User], repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await serializer(users)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(sizes: List[int], rows_per_size: int):
+    print(
+        f"{'users':>7} {'response_model ms':>18} {'fast ms':>9} "
+        f"{'us/user before':>15} {'us/user after':>14} {'speedup':>8}"
+    )
+    for size in sizes:
+        users = make_users(size)
+        assert await fast_body(users) == await response_model_body(users)
+        repeat = max(5, rows_per_size // size)
+        before = await measure(response_model_body, users, repeat)
+        after = await measure(fast_body, users, repeat)
+        print(
+            f"{size:>7} {before:>18.3f} {after:>9.3f} "
+            f"{before * 1000 / size:>15.2f} {after * 1000 / size:>14.2f} "
+            f"{before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 100, 10000], help="users per body"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=50000,
+        help="users serialized per size, spread over the repetitions",
+    )
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.sizes, arguments.rows))
@@ -0,0 +1,150 @@
+"""Database round-trips and latency of the user write paths.
+
+Runs every write path of `UserService` against the former select, mutate,
+commit and refresh implementation, on a scratch schema of the configured
+database, counting the statements, BEGINs and COMMITs sent per request.
+
+    python -m benchmarks.write_round_trips --requests 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import percentile, scratch_engine, seed_users
+from src.dao.db import transaction
+from src.dao.models.user import User
+from src.dto.user import UserCreate, UserUpdate, UserUpdateStatus
+from src.service.converter import Converter
+from src.service.user_service import user_service
+
+
+class RoundTripCounter:
+    """Counts the statements and transaction commands sent through an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(engine.sync_engine, name, self.increment)
+
+    def increment(self, *args, **kwargs):
+        self.count += 1
+
+
+class LegacyUserService:
+    """The write paths as they were before INSERT/UPDATE/DELETE ... RETURNING"""
+
+    @transaction
+    async def create_user_details(self, user_create, db_obj):
+        user_db = Converter.user_create_dto_to_db(user_create)
+        db_obj.add(user_db)
+        await db_obj.commit()
+        await db_obj.refresh(user_db)
+        return user_db
+
+    @transaction
+    async def update_existing_user(self, user_id, user_update, db_obj):
+        result = await db_obj.execute(select(User).filter(User.id == user_id))
+        user_db = result.scalars().first()
+        for key, value in user_update.model_dump(exclude_unset=True).items():
+            setattr(user_db, key, value)
+        await db_obj.commit()
+        await db_obj.refresh(user_db)
+        return user_db
+
+    @transaction
+    async def change_user_status(self, db_obj, user_id, user_update_status):
+        result = await db_obj.execute(select(User).filter(User.id == user_id))
+        user_db = result.scalars().first()
+        user_db.status = user_update_status.status
+        await db_obj.commit()
+        await db_obj.refresh(user_db)
+        return user_db
+
+    @transaction
+    async def delete_existing_user(self, user_id, db_obj):
+        result = await db_obj.execute(select(User).filter(User.id == user_id))
+        user_db = result.scalars().first()
+        await db_obj.delete(user_db)
+        return {"status": "Success"}
+
+
+def write_paths(service, user_ids):
+    """One request per path and user, as the API issues them"""
+    return {
+        "create": lambda session, index: service.create_user_details(
+            UserCreate(
+                first_name="created",
+                last_name=str(index),
+                gender=1,
+                email=f"created{index}@example.com",
+            ),
+            db_obj=session,
+        ),
+        "update": lambda session, index: service.update_existing_user(
+            user_ids[index],
+            UserUpdate(first_name=f"renamed{index}"),
+            db_obj=session,
+        ),
+        "status": lambda session, index: service.change_user_status(
+            db_obj=session,
+            user_id=user_ids[index],
+            user_update_status=UserUpdateStatus(status=index % 3),
+        ),
+        "delete": lambda session, index: service.delete_existing_user(
+            user_ids[index], db_obj=session
+        ),
+    }
+
+
+async def run(requests: int, concurrency: int):
+    async with scratch_engine() as engine:
+        counter = RoundTripCounter(engine)
+        print(
+            f"{'path':>8} {'implementation':>15} {'round-trips':>12} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for name, service in (
+            ("legacy", LegacyUserService()),
+            ("returning", user_service),
+        ):
+            await seed_users(engine, 0, requests)
+            async with AsyncSession(engine) as session:
+                result = await session.execute(select(User.id).order_by(User.id))
+                user_ids = result.scalars().all()
+
+            for path, call in write_paths(service, user_ids).items():
+                counter.count = 0
+                samples = []
+                limiter = asyncio.Semaphore(concurrency)
+
+                async def timed(index):
+                    async with limiter:
+                        async with AsyncSession(
+                            engine, expire_on_commit=False
+                        ) as session:
+                            started = time.perf_counter()
+                            await call(session, index)
+                            samples.append((time.perf_counter() - started) * 1000)
+
+                await asyncio.gather(*(timed(index) for index in range(requests)))
+                print(
+                    f"{path:>8} {name:>15} {counter.count / requests:>12.1f} "
+                    f"{percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f} "
+                    f"{percentile(samples, 99):>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--requests", type=int, default=500, help="requests per write path"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="requests in flight at once"
+    )
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.requests, arguments.concurrency))
@@ -0,0 +1,58 @@
+"""Command line import of users from a CSV or NDJSON file, or from stdin.
+
+python import_users.py partners.csv --rejects partners.rejects.ndjson
+curl -s https://partner.example/users.ndjson | python import_users.py - --format ndjson
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.dao.db import database
+from src.service.user_import import import_users
+from src.utils.constants import IMPORT_BATCH_SIZE, ExportFormat
+
+
+async def main(arguments: argparse.Namespace):
+    """Run the import with the command line arguments and print its summary"""
+    import_format = ExportFormat(arguments.format)
+    source = (
+        sys.stdin
+        if arguments.source == "-"
+        else open(arguments.source, newline="", encoding="utf-8")
+    )
+    try:
+        with source, open(arguments.rejects, "w", encoding="utf-8") as reject_file:
+            summary = await import_users(
+                source, import_format, reject_file, batch_size=arguments.batch_size
+            )
+    finally:
+        await database.close()
+    print(
+        f"Imported {summary['imported']} users, "
+        f"rejected {summary['rejected']} rows to {arguments.rejects}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="path of the file to import, - for stdin")
+    parser.add_argument(
+        "--format",
+        choices=[import_format.value for import_format in ExportFormat],
+        help="format of the source, guessed from the file extension by default",
+    )
+    parser.add_argument(
+        "--rejects",
+        default="rejects.ndjson",
+        help="NDJSON file receiving the rejected rows",
+    )
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    arguments = parser.parse_args()
+    if arguments.format is None:
+        arguments.format = (
+            ExportFormat.CSV.value
+            if arguments.source.endswith(".csv")
+            else ExportFormat.NDJSON.value
+        )
+    asyncio.run(main(arguments))
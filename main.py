@@ -1,14 +1,42 @@
 """Entrypoint of the API"""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from src.api import user, healthcheck, version
+from src.api import user, healthcheck, metrics, version
+from src.core.config import settings
+from src.core.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestTimingMiddleware,
+)
+from src.dao.db import database
 import uvicorn
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the database engines with warmed up pools, and disposes them on shutdown"""
+    await database.start()
+    yield
+    await database.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# added first so that it runs innermost, the profiles leave out the other middlewares
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if settings.SERVER_TIMING_ENABLED or settings.REQUEST_STATEMENT_WARN_THRESHOLD:
+    app.add_middleware(RequestTimingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(user.router)
 app.include_router(healthcheck.router)
 app.include_router(version.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000,reload=True)
@@ -0,0 +1,108 @@
+"""Production entrypoint of the API, serving main:app from several worker processes.
+
+python server.py
+python server.py --workers 4 --port 8080
+
+uvloop and httptools are used when installed (pip install uvloop httptools).
+On SIGTERM the workers stop accepting connections and finish the requests in
+flight, for up to SERVER_GRACEFUL_SHUTDOWN_SECONDS.
+"""
+
+import argparse
+import copy
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(workers: int) -> int:
+    """
+    This function resolves the number of worker processes, one per CPU when not set.
+    Every worker keeps at least one pooled connection, so there are never more
+    workers than DATABASE_POOL_SIZE and the connection budget is never exceeded.
+
+    :param workers: The configured number of workers, 0 for one per CPU
+    :return: The number of worker processes
+    """
+    requested = workers or os.cpu_count() or 1
+    budget = max(settings.DATABASE_POOL_SIZE, 1)
+    if requested > budget:
+        logger.warning(
+            "Starting %s workers instead of %s, DATABASE_POOL_SIZE=%s leaves no "
+            "pooled connection to the others",
+            budget,
+            requested,
+            settings.DATABASE_POOL_SIZE,
+        )
+        return budget
+    return requested
+
+
+def log_config():
+    """
+    This function extends the logging configuration of uvicorn, which every worker
+    applies, with the loggers of the application.
+
+    :return: The logging configuration of the workers
+    """
+    config = copy.deepcopy(uvicorn.config.LOGGING_CONFIG)
+    config["loggers"]["src"] = {
+        "handlers": ["default"],
+        "level": "INFO",
+        "propagate": False,
+    }
+    # the pool logs under its class, quiet like the other SQLAlchemy pools
+    config["loggers"]["src.dao.instrumentation.TimedAsyncAdaptedQueuePool"] = {
+        "level": "WARNING"
+    }
+    return config
+
+
+def main(arguments: argparse.Namespace):
+    """Serve the app with the command line arguments"""
+    logging.basicConfig(level=logging.INFO)
+    workers = worker_count(arguments.workers)
+    # read by the settings of every worker, which divide the database pools between them
+    os.environ["SERVER_WORKERS"] = str(workers)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(
+        "Serving on %s:%s with %s workers, %s event loop and %s parser",
+        arguments.host,
+        arguments.port,
+        workers,
+        loop,
+        http,
+    )
+    uvicorn.run(
+        "main:app",
+        host=arguments.host,
+        port=arguments.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        # behind a load balancer, the client address comes from X-Forwarded-For
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        log_config=log_config(),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.SERVER_HOST, help="bind address")
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="worker processes, 0 for one per CPU",
+    )
+    main(parser.parse_args())
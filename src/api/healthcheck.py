@@ -2,7 +2,12 @@
 
 from http import HTTPStatus
 
+from typing import List
+
 from fastapi import APIRouter, HTTPException
+from src.dao.db import database, pool_status
+from src.dto.healthcheck import CacheStatsResponse, PoolStatusResponse
+from src.service.cache import user_cache, user_count_cache, user_list_cache
 
 router = APIRouter(tags=["Healthcheck"])
 
@@ -13,6 +18,33 @@ def health_check():
     return HTTPStatus.OK
 
 
+@router.get(
+    "/healthcheck/db-pool",
+    status_code=HTTPStatus.OK,
+    response_model=List[PoolStatusResponse],
+)
+def get_db_pool_status():
+    """returns the live checkout and overflow counters of the database pools"""
+    return [pool_status("primary", database.engine)] + [
+        pool_status(f"replica-{index}", replica_engine)
+        for index, replica_engine in enumerate(database.replica_engines)
+    ]
+
+
+@router.get(
+    "/healthcheck/cache",
+    status_code=HTTPStatus.OK,
+    response_model=List[CacheStatsResponse],
+)
+def get_cache_stats():
+    """returns the size and hit, miss and eviction counters of the caches of this worker"""
+    return [
+        {"name": "user", **user_cache.stats()},
+        {"name": "user-count", **user_count_cache.stats()},
+        {"name": "user-list", **user_list_cache.stats()},
+    ]
+
+
 @router.get("/status_code/{status_code}")
 async def get_status_code_for_testing(status_code: int):
     """
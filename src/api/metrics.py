@@ -0,0 +1,16 @@
+"""Metrics Endpoint"""
+
+from http import HTTPStatus
+
+from fastapi import APIRouter, Response
+
+from src.core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", status_code=HTTPStatus.OK, include_in_schema=False)
+async def get_metrics():
+    """returns the metrics of this worker in the Prometheus text exposition format,
+    rendered on the event loop thread that updates them"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
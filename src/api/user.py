@@ -1,15 +1,92 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Body, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from src.dao.db import get_db
-from src.dto.user import UserCreate, UserUpdate, UserResponse, UserUpdateStatus
+from src.dao.db import get_db, get_read_db
+from src.dto.user import (
+    UserBatchGet,
+    UserBulkCreateResponse,
+    UserBulkStatusResponse,
+    UserBulkUpdateStatus,
+    UserCreate,
+    UserUpdate,
+    UserResponse,
+    UserUpdateStatus,
+)
+from src.core.config import settings
+from src.service.converter import Converter
 from src.service.user_service import user_service
 from src.api.common_endpoints import USER
+from src.utils.constants import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    CountMode,
+    ExportFormat,
+)
+from src.utils.utils import http_date, is_not_modified, make_etag
 from uuid import UUID
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["Users"])
 
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None):
+    """
+    Builds the cache validator headers of a response. Clients may keep the
+    body but must revalidate it with If-None-Match or If-Modified-Since.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def user_json_response(
+    users: Any,
+    response: Response,
+    headers: Optional[dict] = None,
+    fields: Optional[Sequence[str]] = None,
+):
+    """
+    Returns a user, or a list of users, for the response_model serialization, or
+    already encoded with orjson when fast serialization is enabled or only some
+    fields are requested, which the response_model cannot describe. The headers are
+    passed explicitly as a returned Response does not carry the ones of `response`.
+    """
+    headers = headers or {}
+    if settings.FAST_SERIALIZATION_ENABLED or fields is not None:
+        return Response(
+            content=Converter.users_to_json(users, fields),
+            media_type="application/json",
+            headers=headers,
+        )
+    response.headers.update(headers)
+    return users
+
+
+@router.get(USER + "/export", response_class=StreamingResponse)
+async def export_users(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    search: Optional[str] = None,
+):
+    """
+    This endpoint streams all the users, or the ones matching the search, as NDJSON or CSV.
+    Users are read through a server side cursor so memory stays flat whatever the table size.
+    """
+    return StreamingResponse(
+        user_service.export_users(export_format=export_format, search=search),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=users.{export_format.value}"
+        },
+    )
+
 
 @router.get(USER + "/{user_id}", response_model=UserResponse)
 # def get_single_user(user_id: UUID, db_obj: Session = Depends(get_db)):
@@ -20,11 +97,27 @@ router = APIRouter(tags=["Users"])
 #     return user_service.get_user_by_id(user_id, db_obj=db_obj)
 
 
-async def get_single_user(user_id: UUID, db_obj: AsyncSession = Depends(get_db)):
+async def get_single_user(
+    user_id: UUID,
+    request: Request,
+    response: Response,
+    db_obj: AsyncSession = Depends(get_read_db),
+    fields: Optional[str] = None,
+):
     """
-    This endpoint gets single user details by user id
+    This endpoint gets single user details by user id.
+    `fields` takes a comma separated list of response fields, e.g. `id,firstName,status`,
+    to return only those. The whole user is still loaded so that it can be cached.
+    The ETag and Last-Modified come from the user id and updated_at, a request whose
+    If-None-Match or If-Modified-Since still matches gets an empty 304 response.
     """
-    return await user_service.get_user_by_id(user_id=user_id, db_obj=db_obj)
+    selected_fields = Converter.parse_fields(fields)
+    user = await user_service.get_user_by_id(user_id=user_id, db_obj=db_obj)
+    etag = make_etag(user.id, user.updated_at.isoformat(), selected_fields)
+    headers = validator_headers(etag, user.updated_at)
+    if is_not_modified(request.headers, etag, user.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return user_json_response(user, response, headers, selected_fields)
 
 
 @router.post(USER, response_model=UserResponse)
@@ -37,12 +130,52 @@ async def get_single_user(user_id: UUID, db_obj: AsyncSession = Depends(get_db))
 
 
 async def create_new_user(
-    user_create: UserCreate, db_obj: AsyncSession = Depends(get_db)
+    user_create: UserCreate, response: Response, db_obj: AsyncSession = Depends(get_db)
 ):
     """
     This endpoint creates a new user.
     """
-    return await user_service.create_user_details(user_create, db_obj=db_obj)
+    user = await user_service.create_user_details(user_create, db_obj=db_obj)
+    return user_json_response(user, response)
+
+
+@router.post(USER + "/bulk", response_model=UserBulkCreateResponse)
+async def create_users_bulk(
+    users: List[Dict[str, Any]] = Body(...),
+    db_obj: AsyncSession = Depends(get_db),
+):
+    """
+    This endpoint creates many users at once. Each user is validated separately,
+    the invalid ones are reported in `errors` while the valid ones are created.
+    """
+    return await user_service.create_users_bulk(users, db_obj=db_obj)
+
+
+@router.post(USER + "/batch-get", response_model=List[UserResponse])
+async def get_users_batch(
+    user_batch_get: UserBatchGet,
+    response: Response,
+    db_obj: AsyncSession = Depends(get_read_db),
+):
+    """
+    This endpoint gets many users by id at once, in the order of the given ids.
+    Unknown ids are left out of the response.
+    """
+    users = await user_service.get_users_by_ids(user_batch_get.ids, db_obj=db_obj)
+    return user_json_response(users, response)
+
+
+@router.patch(USER + "/status", response_model=UserBulkStatusResponse)
+async def change_users_status_bulk(
+    user_bulk_update_status: UserBulkUpdateStatus,
+    db_obj: AsyncSession = Depends(get_db),
+):
+    """
+    This endpoint updates the status of the users given by ids, or of all the users matching a filter.
+    """
+    return await user_service.change_users_status_bulk(
+        user_bulk_update_status, db_obj=db_obj
+    )
 
 
 @router.patch(USER + "/{user_id}", response_model=UserResponse)
@@ -55,12 +188,16 @@ async def create_new_user(
 
 
 async def update_existing_user(
-    user_id: UUID, user_update: UserUpdate, db_obj: AsyncSession = Depends(get_db)
+    user_id: UUID,
+    user_update: UserUpdate,
+    response: Response,
+    db_obj: AsyncSession = Depends(get_db),
 ):
     """
     This endpoint updates an existing user details in the database.
     """
-    return await user_service.update_existing_user(user_id, user_update, db_obj=db_obj)
+    user = await user_service.update_existing_user(user_id, user_update, db_obj=db_obj)
+    return user_json_response(user, response)
 
 
 @router.delete(USER + "/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -103,24 +240,57 @@ async def delete_existing_user(user_id: UUID, db_obj: AsyncSession = Depends(get
 
 
 async def get_all_users(
-    db_obj: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    db_obj: AsyncSession = Depends(get_read_db),
     search: Optional[str] = None,
     sort_by: Optional[str] = "created_at",
     sort_order: Optional[str] = "asc",
     limit: Optional[int] = 10,
     offset: Optional[int] = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    count: CountMode = CountMode.NONE,
 ):
     """
     This endpoint gets the user from the database by applying filtering, searching and sorting.
+    When more users follow, the X-Next-Cursor header carries the cursor of the next page;
+    passing it back as `cursor` pages by keyset instead of offset.
+    `fields` takes a comma separated list of response fields, e.g. `id,firstName,status`,
+    only those columns are selected and returned.
+    `count` adds the number of users matching the search in the X-Total-Count header:
+    `exact` counts them, cached for a few seconds, `estimated` reads the planner
+    estimate without scanning the table and `none`, the default, skips it.
+    The ETag hashes the id and updated_at of every user of the page, a request whose
+    If-None-Match still matches gets an empty 304 response.
     """
-    return await user_service.get_all_users(
+    selected_fields = Converter.parse_fields(fields)
+    page = await user_service.get_all_users(
         db_obj=db_obj,
         search=search,
         sort_by=sort_by,
         sort_order=sort_order,
         limit=limit,
         offset=offset,
+        cursor=cursor,
+        fields=selected_fields,
+        count=count,
+    )
+    etag = make_etag(
+        page.next_cursor,
+        selected_fields,
+        *(f"{user.id}:{user.updated_at.isoformat()}" for user in page.items),
     )
+    # no Last-Modified, a deleted user would not make it move
+    headers = validator_headers(etag)
+    if page.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    # also sent with a 304, the total can change while the page does not
+    if page.total is not None:
+        headers[TOTAL_COUNT_HEADER] = str(page.total)
+    if is_not_modified(request.headers, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return user_json_response(page.items, response, headers, selected_fields)
 
 
 @router.patch(USER + "/{user_id}" + "/status", response_model=UserResponse)
@@ -141,11 +311,13 @@ async def get_all_users(
 async def change_user_status(
     user_id: UUID,
     user_update_status: UserUpdateStatus,
+    response: Response,
     db_obj: AsyncSession = Depends(get_db),
 ):
     """
     This endpoint updates an existing user's status in the database.
     """
-    return await user_service.change_user_status(
+    user = await user_service.change_user_status(
         user_id=user_id, user_update_status=user_update_status, db_obj=db_obj
     )
+    return user_json_response(user, response)
@@ -13,6 +13,74 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "name"
     DATABASE_USERNAME: str = "username"
 
+    # server.py, SERVER_WORKERS=0 starts one worker process per CPU
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    # Seconds the requests in flight get to finish on SIGTERM
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: float = 30.0
+    # Comma separated addresses of the proxies trusted for X-Forwarded-For
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
+    # SQLAlchemy engine and connection pool. The pool sizes are the budget of the whole
+    # server, each of the SERVER_WORKERS processes gets its share of them
+    DATABASE_ECHO: bool = False
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_CONNECT_TIMEOUT: float = 10.0
+    # asyncpg prepared statement cache per connection, 0 disables it (e.g. behind pgbouncer)
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    # Connections opened per engine when the API starts, capped at the pool size of the worker
+    DATABASE_WARMUP_CONNECTIONS: int = 5
+    # Prepare the hot user read statements on the warmed up connections
+    DATABASE_WARMUP_PREPARE_STATEMENTS: bool = True
+
+    # Comma separated postgresql+asyncpg urls of the read replicas, empty to read from the primary
+    DATABASE_REPLICA_URLS: str = ""
+    # Seconds an unreachable replica stays out of the rotation
+    DATABASE_REPLICA_RETRY_INTERVAL: float = 30.0
+    # Seconds the replicas may lag behind the primary, users, pages and counts read
+    # this soon after a write are not cached
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 1.0
+
+    # In-process LRU cache of GET /users/{user_id}, per worker process
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Exact user counts of GET /users?count=exact, cached per search, 0 disables the cache
+    USER_COUNT_CACHE_MAX_SIZE: int = 1000
+    USER_COUNT_CACHE_TTL_SECONDS: float = 10.0
+
+    # Pages of GET /users, cached per query until the next user write of the worker,
+    # the TTL bounds the staleness of writes made through other workers, 0 disables it
+    USER_LIST_CACHE_MAX_SIZE: int = 1000
+    USER_LIST_CACHE_TTL_SECONDS: float = 5.0
+
+    # Encode user responses with orjson straight from the rows, skipping response_model validation
+    FAST_SERIALIZATION_ENABLED: bool = True
+
+    # Prometheus metrics of the requests and the database engines, served at GET /metrics
+    METRICS_ENABLED: bool = True
+
+    # Server-Timing header with the statements and database time of every request
+    SERVER_TIMING_ENABLED: bool = True
+    # Statements slower than this are logged with their parameters redacted, 0 disables the log
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    # Requests running more statements than this are logged, 0 disables the warning
+    REQUEST_STATEMENT_WARN_THRESHOLD: int = 20
+
+    # cProfile of single requests, written as .pstats files, the middleware is not added when disabled
+    PROFILING_ENABLED: bool = False
+    # Requests sending this value in the X-Profile header are profiled, empty disables the header
+    PROFILING_HEADER_SECRET: str = ""
+    # Share of the requests profiled at random, from 0 to 1
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+
     class Config:
         """
         settings for Settings configurations
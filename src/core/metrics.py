@@ -0,0 +1,222 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+The metrics are updated from the event loop thread, by the middlewares and the
+SQLAlchemy engine events, and read by GET /metrics, which must therefore render
+on the event loop thread too. Every worker process holds its own values and the
+workers of server.py share one port, so each scrape reads a single random worker
+and the series jump between workers. The metrics are only reliable with one
+worker per scraped address."""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Request latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statement and pool wait buckets, in seconds
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label_value(value: str) -> str:
+    """
+    This function escapes a label value for the text exposition format.
+
+    :param value: The raw label value
+    :return: The escaped label value
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """
+    This function formats the label set of a sample, e.g. {method="GET",route="/users"}.
+
+    :param names: The label names
+    :param values: The label values, in the order of names
+    :param extra: An already formatted label appended to the set, e.g. le="0.5"
+    :return: The formatted label set, empty without labels
+    """
+    pairs = [
+        f'{name}="{escape_label_value(str(value))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    """
+    This function formats a sample value, integral values without a decimal part.
+
+    :param value: The sample value
+    :return: The formatted value
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base of the metric families, registered in the registry on creation"""
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry=None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry or REGISTRY).register(self)
+
+    def samples(self) -> Iterable[str]:
+        """
+        This function lists the sample lines of the metric.
+
+        :return: The sample lines
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """
+        This function renders the metric family, its HELP and TYPE lines then its samples.
+
+        :return: The lines of the metric family
+        """
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            labels = format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Gauge(Metric):
+    """Value going up and down per label set"""
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) - amount
+
+    def set(self, *labelvalues: str, value: float):
+        self._values[labelvalues] = value
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            labels = format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class CallbackGauge(Metric):
+    """Gauge whose values are read by a callback when the metrics are rendered"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+        registry=None,
+    ):
+        super().__init__(name, documentation, labelnames, registry=registry)
+        self.callback = callback
+
+    def samples(self):
+        for labelvalues, value in self.callback():
+            labels = format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets per label set"""
+
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: the count of every bucket, +Inf last, then the sum
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._values.get(labelvalues)
+        if series is None:
+            series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        # le is inclusive, bisect_left finds the first bucket with value <= bound
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labelvalues, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = format_labels(
+                    self.labelnames, labelvalues, f'le="{format_value(bound)}"'
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """The metric families exposed by GET /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        This function renders every registered metric family.
+
+        :return: The metrics in the text exposition format
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,200 @@
+"""ASGI middlewares of the API"""
+
+import asyncio
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+from src.core.metrics import Gauge, Histogram
+from src.dao.instrumentation import RequestStatistics, request_statistics
+from src.utils.constants import PROFILE_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Route label of the requests matching no route, keeps the label set bounded
+UNMATCHED_ROUTE = "unmatched"
+
+# Labelled by method only, the route is not known before the router ran
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    ("method",),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, until the response is sent",
+    ("method", "route", "status"),
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the in-flight requests per method and the
+    request latency per method, route and status. The route is the path template
+    the router stores in the scope, e.g. /users/{user_id}, so that the metrics are
+    labelled per route and not per url. It wraps send instead of subclassing
+    BaseHTTPMiddleware, which would run every request in a separate task.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # a request failing before its response is sent is answered 500
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            # also set when the path matches with another method, answered 405
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_DURATION.observe(duration, method, route, status)
+            HTTP_REQUESTS_IN_FLIGHT.dec(method)
+
+
+class RequestTimingMiddleware:
+    """
+    Pure ASGI middleware accounting the statements run by every request and the
+    time spent on them, added to the response as a Server-Timing header, e.g.
+    Server-Timing: db;dur=3.1;desc="2 statements", app;dur=5.4
+    The durations are measured until the response starts, the body of a streamed
+    response is not included. Requests running too many statements are logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.server_timing = settings.SERVER_TIMING_ENABLED
+        self.statement_warn_threshold = settings.REQUEST_STATEMENT_WARN_THRESHOLD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        statistics = RequestStatistics()
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if self.server_timing and message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"]).append(
+                    "Server-Timing",
+                    f"db;dur={statistics.database_seconds * 1000:.1f};"
+                    f'desc="{statistics.statements} statements", '
+                    f"app;dur={(time.perf_counter() - started) * 1000:.1f}",
+                )
+            await send(message)
+
+        token = request_statistics.set(statistics)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_statistics.reset(token)
+            if 0 < self.statement_warn_threshold < statistics.statements:
+                # the router stores the matched route in the scope
+                route = getattr(scope.get("route"), "path", scope["path"])
+                logger.warning(
+                    "%s %s ran %s statements in %.1fms, more than %s",
+                    scope["method"],
+                    route,
+                    statistics.statements,
+                    statistics.database_seconds * 1000,
+                    self.statement_warn_threshold,
+                )
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware running cProfile over the requests sending the profiling
+    secret in the X-Profile header, and over a random sample of the others. The
+    profile of each request is written to the output directory as a .pstats file,
+    to be read with pstats or snakeviz.
+
+    cProfile measures the whole thread, so the other requests served by the event
+    loop meanwhile show up in the profile too. One request is profiled at a time,
+    the requests arriving meanwhile are not profiled.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.secret = settings.PROFILING_HEADER_SECRET.encode()
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.output_dir = settings.PROFILING_OUTPUT_DIR
+        self.header = PROFILE_HEADER.lower().encode()
+        self._profiling = False
+
+    def should_profile(self, scope: Scope) -> bool:
+        """
+        This function decides whether a request is profiled.
+
+        :param scope: The ASGI scope of the request
+        :return: True when the request carries the secret or is sampled
+        """
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == self.header and hmac.compare_digest(value, self.secret):
+                    return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._profiling or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.disable()
+        finally:
+            self._profiling = False
+
+        duration = time.perf_counter() - started
+        route = getattr(scope.get("route"), "path", scope["path"])
+        file_name = "{}-{}-{}-{:.0f}ms.pstats".format(
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f"),
+            scope["method"],
+            re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root",
+            duration * 1000,
+        )
+        path = os.path.join(self.output_dir, file_name)
+        await asyncio.to_thread(self.write_profile, profiler, path)
+        logger.info(
+            "Profile of %s %s written to %s", scope["method"], scope["path"], path
+        )
+
+    def write_profile(self, profiler: cProfile.Profile, path: str):
+        """
+        This function writes a profile, off the event loop.
+
+        :param profiler: The profiler of the request
+        :param path: The .pstats file to write
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        profiler.dump_stats(path)
@@ -1,8 +1,23 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from src.core.config import settings
+from src.dao.instrumentation import TimedAsyncAdaptedQueuePool, instrument_engine
+from src.dao.users import UserDAO
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import asyncio
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # # For synchronous way by using create_engine
 # from sqlalchemy import create_engine
@@ -30,8 +45,295 @@ import asyncio
 
 SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.DATABASE_USERNAME}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOST}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+def pool_sizes():
+    """
+    This function divides the configured pool sizes between the worker processes
+    started by server.py, so that all of them together stay within the budget:
+    each worker keeps DATABASE_POOL_SIZE // workers connections and may open
+    DATABASE_MAX_OVERFLOW // workers more. server.py starts at most
+    DATABASE_POOL_SIZE workers, so that every worker keeps at least one.
+
+    :return: The pool_size and max_overflow of this worker process
+    """
+    workers = max(settings.SERVER_WORKERS, 1)
+    return (
+        max(settings.DATABASE_POOL_SIZE // workers, 1),
+        settings.DATABASE_MAX_OVERFLOW // workers,
+    )
+
+
+def create_engine_from_settings(database_url: str, name: str = "primary"):
+    """
+    This function creates an async engine whose pool and driver options come from the settings,
+    with its statements timed for GET /metrics, Server-Timing and the slow statement log.
+
+    :param database_url: The database url to connect to
+    :param name: The engine label of the metrics
+    :return: The configured AsyncEngine
+    """
+    pool_size, max_overflow = pool_sizes()
+    metrics_options = (
+        {"poolclass": TimedAsyncAdaptedQueuePool, "pool_logging_name": name}
+        if settings.METRICS_ENABLED
+        else {}
+    )
+    database_engine = create_async_engine(
+        database_url,
+        echo=settings.DATABASE_ECHO,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args={
+            "timeout": settings.DATABASE_CONNECT_TIMEOUT,
+            # cache of SQLAlchemy's asyncpg adapter and asyncpg's own one
+            "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+        },
+        **metrics_options,
+    )
+    instrument_engine(name, database_engine)
+    return database_engine
+
+
+def pool_status(name: str, database_engine: AsyncEngine):
+    """
+    This function reads the live connection pool counters of an engine.
+
+    :param name: The name reported for the engine
+    :param database_engine: The engine to inspect
+    :return: Dictionary with the pool counters
+    """
+    pool = database_engine.pool
+    return {
+        "name": name,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool counts the overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool_sizes()[1],
+    }
+
+
+class ReplicaRouter:
+    """
+    Round-robin selection of the read replicas. A replica that fails to hand out
+    a connection is skipped until its retry interval has elapsed.
+    """
+
+    def __init__(self, session_factories: List[sessionmaker], retry_interval: float):
+        self.session_factories = session_factories
+        self.retry_interval = retry_interval
+        self._turn = itertools.count()
+        self._unhealthy_until = [0.0] * len(session_factories)
+
+    def candidates(self):
+        """
+        This function lists the healthy replicas, starting from the next one in turn.
+
+        :return: Indexes of the replicas to try in order
+        """
+        if not self.session_factories:
+            return []
+        start = next(self._turn) % len(self.session_factories)
+        now = time.monotonic()
+        return [
+            index % len(self.session_factories)
+            for index in range(start, start + len(self.session_factories))
+            if self._unhealthy_until[index % len(self.session_factories)] <= now
+        ]
+
+    def mark_unhealthy(self, index: int):
+        """
+        This function takes a replica out of the rotation for the retry interval.
+
+        :param index: Index of the failing replica
+        """
+        self._unhealthy_until[index] = time.monotonic() + self.retry_interval
+
+
+async def prepare_statements(connection: AsyncConnection):
+    """
+    This function runs the hot read statements of the users once on a connection,
+    so that they are compiled and prepared before the first request needs them.
+    Nothing is written, the transaction is rolled back.
+
+    :param connection: The pooled connection to prepare the statements on
+    """
+    async with AsyncSession(bind=connection) as session:
+        # GET /users/{user_id} and POST /users/batch-get
+        await UserDAO.get_users(db_obj=session, user_ids=[])
+        # GET /users with the default parameters, and its exact count
+        await UserDAO.all_user(db_obj=session)
+        await UserDAO.count_users(db_obj=session)
+        await session.rollback()
+
+
+async def warm_up_engine(
+    name: str, database_engine: AsyncEngine, connections: int, prepare: bool
+):
+    """
+    This function opens pooled connections ahead of the first requests, so that
+    they do not pay for the connection handshakes.
+
+    :param name: The name reported for the engine
+    :param database_engine: The engine whose pool is warmed up
+    :param connections: The number of connections to open, capped at the pool size
+    :param prepare: Whether to prepare the hot statements on every connection
+    :return: Dictionary with the timing of the warm-up
+    """
+    connections = min(connections, database_engine.pool.size())
+    started = time.perf_counter()
+    opened = await asyncio.gather(
+        *(database_engine.connect() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    connected = [
+        connection for connection in opened if isinstance(connection, AsyncConnection)
+    ]
+    connected_at = time.perf_counter()
+    prepared = []
+    if prepare:
+        prepared = await asyncio.gather(
+            *(prepare_statements(connection) for connection in connected),
+            return_exceptions=True,
+        )
+    # back to the pool, which keeps them open
+    await asyncio.gather(*(connection.close() for connection in connected))
+    # the API still starts, the requests open the missing connections themselves
+    errors = [error for error in [*opened, *prepared] if isinstance(error, Exception)]
+    if errors:
+        logger.warning(
+            "Warm-up of %s incomplete, %s of %s connections opened: %s",
+            name,
+            len(connected),
+            connections,
+            errors[0],
+        )
+    return {
+        "name": name,
+        "connections": len(connected),
+        "connect_ms": (connected_at - started) * 1000,
+        "prepare_ms": (time.perf_counter() - connected_at) * 1000,
+    }
+
+
+class Database:
+    """
+    The engines and session factories of the process. The API opens them in its
+    lifespan, warming up the pools, and closes them on shutdown. Scripts and
+    benchmarks that run without the lifespan get them opened on first use.
+    """
+
+    def __init__(self):
+        self._engine: Optional[AsyncEngine] = None
+        self._session_factory: Optional[sessionmaker] = None
+        self._replica_engines: List[AsyncEngine] = []
+        self._replica_router: Optional[ReplicaRouter] = None
+
+    def open(self):
+        """
+        This function creates the primary and replica engines and their session factories.
+        """
+        if self._engine is not None:
+            return
+        self._engine = create_engine_from_settings(SQLALCHEMY_DATABASE_URL)
+        self._session_factory = sessionmaker(
+            self._engine, class_=AsyncSession, expire_on_commit=False
+        )
+        replica_urls = [
+            url.strip()
+            for url in settings.DATABASE_REPLICA_URLS.split(",")
+            if url.strip()
+        ]
+        self._replica_engines = [
+            create_engine_from_settings(url, name=f"replica-{index}")
+            for index, url in enumerate(replica_urls)
+        ]
+        self._replica_router = ReplicaRouter(
+            [
+                sessionmaker(
+                    replica_engine, class_=AsyncSession, expire_on_commit=False
+                )
+                for replica_engine in self._replica_engines
+            ],
+            retry_interval=settings.DATABASE_REPLICA_RETRY_INTERVAL,
+        )
+
+    @property
+    def engine(self) -> AsyncEngine:
+        self.open()
+        return self._engine
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        self.open()
+        return self._session_factory
+
+    @property
+    def replica_engines(self) -> List[AsyncEngine]:
+        self.open()
+        return self._replica_engines
+
+    @property
+    def replica_router(self) -> ReplicaRouter:
+        self.open()
+        return self._replica_router
+
+    async def start(self):
+        """
+        This function opens the engines and warms up their pools, then logs how long it took.
+        """
+        started = time.perf_counter()
+        self.open()
+        engines = [("primary", self._engine)] + [
+            (f"replica-{index}", replica_engine)
+            for index, replica_engine in enumerate(self._replica_engines)
+        ]
+        warm_ups = await asyncio.gather(
+            *(
+                warm_up_engine(
+                    name,
+                    database_engine,
+                    settings.DATABASE_WARMUP_CONNECTIONS,
+                    settings.DATABASE_WARMUP_PREPARE_STATEMENTS,
+                )
+                for name, database_engine in engines
+            )
+        )
+        logger.info(
+            "Database ready in %.1fms: %s",
+            (time.perf_counter() - started) * 1000,
+            ", ".join(
+                "{name} {connections} connections in {connect_ms:.1f}ms, "
+                "statements prepared in {prepare_ms:.1f}ms".format(**warm_up)
+                for warm_up in warm_ups
+            ),
+        )
+
+    async def close(self):
+        """
+        This function closes the pooled connections of every engine and forgets the engines.
+        """
+        if self._engine is None:
+            return
+        started = time.perf_counter()
+        engines = [self._engine, *self._replica_engines]
+        self._engine = self._session_factory = self._replica_router = None
+        self._replica_engines = []
+        await asyncio.gather(
+            *(database_engine.dispose() for database_engine in engines)
+        )
+        logger.info(
+            "Database engines disposed in %.1fms",
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+database = Database()
 
 Base = declarative_base()
 
@@ -40,7 +342,47 @@ async def get_db():
     """
     This function creates a new database async session.
     """
-    async with async_session() as session:
+    async with database.session_factory() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session():
+    """
+    This function opens an async session for read only work on the next healthy
+    replica, falling back to the primary when no replica is configured or reachable.
+    Replicas lag behind the primary, so reads following a write of the same
+    request must keep using the primary session.
+    """
+    replica_router = database.replica_router
+    for index in replica_router.candidates():
+        session = replica_router.session_factories[index]()
+        try:
+            # Checking out the connection up front surfaces an unreachable replica here
+            await session.connection()
+        except (OSError, SQLAlchemyError) as replica_exception:
+            await session.close()
+            replica_router.mark_unhealthy(index)
+            logger.warning(
+                "Read replica %s is unavailable, skipping it for %ss: %s",
+                index,
+                replica_router.retry_interval,
+                replica_exception,
+            )
+            continue
+        async with session:
+            yield session
+        return
+
+    async with database.session_factory() as session:
+        yield session
+
+
+async def get_read_db():
+    """
+    This function creates a new read only database async session, on a replica when available.
+    """
+    async with read_session() as session:
         yield session
 
 
@@ -0,0 +1,192 @@
+"""Metrics of the SQLAlchemy engines, collected with engine and pool events"""
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.config import settings
+from src.core.metrics import DB_BUCKETS, CallbackGauge, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# First keyword of the statements timed on their own, the others count as OTHER
+STATEMENT_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+# Engines whose pools are reported, by name
+instrumented_engines: Dict[str, AsyncEngine] = {}
+
+
+class RequestStatistics:
+    """Statements run on behalf of one request and the time spent on them"""
+
+    __slots__ = ("statements", "database_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.database_seconds = 0.0
+
+
+# Statistics of the current request, set by RequestTimingMiddleware. The engine
+# events run in SQLAlchemy's greenlets, which share the context of the request
+# task, and the tasks created by the request copy it.
+request_statistics: ContextVar[Optional[RequestStatistics]] = ContextVar(
+    "request_statistics", default=None
+)
+
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing a SQL statement on the database",
+    ("engine", "operation"),
+    buckets=DB_BUCKETS,
+)
+DB_STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "SQL statements that raised an error",
+    ("engine",),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool, opening it included",
+    ("engine",),
+    buckets=DB_BUCKETS,
+)
+
+
+def pool_gauge(attribute: str):
+    """
+    This function builds the callback of a pool gauge, reading one pool counter of every engine.
+
+    :param attribute: The name of the pool method returning the counter
+    :return: The gauge callback
+    """
+
+    def collect():
+        for name, instrumented_engine in instrumented_engines.items():
+            value = getattr(instrumented_engine.pool, attribute)()
+            # QueuePool counts the overflow from -pool_size until the pool is full
+            yield (name,), max(value, 0)
+
+    return collect
+
+
+CallbackGauge(
+    "db_pool_size", "Configured size of the pool", ("engine",), pool_gauge("size")
+)
+CallbackGauge(
+    "db_pool_checked_out",
+    "Connections currently in use",
+    ("engine",),
+    pool_gauge("checkedout"),
+)
+CallbackGauge(
+    "db_pool_checked_in",
+    "Idle connections held by the pool",
+    ("engine",),
+    pool_gauge("checkedin"),
+)
+CallbackGauge(
+    "db_pool_overflow",
+    "Connections opened beyond the pool size",
+    ("engine",),
+    pool_gauge("overflow"),
+)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default pool of the async engines, timing how long a checkout waits for
+    a connection. The engine name is the pool logging_name, which survives the
+    pool being recreated by engine.dispose().
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started, self.logging_name)
+
+
+def statement_operation(statement: str) -> str:
+    """
+    This function reads the operation of a statement, from its first keyword.
+
+    :param statement: The SQL statement
+    :return: The operation label of the statement
+    """
+    words = statement.split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in STATEMENT_OPERATIONS else "OTHER"
+
+
+def redact_parameters(parameters, executemany: bool):
+    """
+    This function replaces the parameters of a statement by their types, so that
+    the logs never hold user data.
+
+    :param parameters: The parameters sent with the statement
+    :param executemany: Whether parameters holds one set per row
+    :return: The redacted parameters
+    """
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def account_statement(duration: float):
+    """
+    This function adds a statement to the statistics of the current request, if any.
+
+    :param duration: Seconds spent on the statement
+    """
+    statistics = request_statistics.get()
+    if statistics is not None:
+        statistics.statements += 1
+        statistics.database_seconds += duration
+
+
+def instrument_engine(name: str, database_engine: AsyncEngine):
+    """
+    This function times every statement of an engine, accounts it to the current
+    request, logs the slow ones and reports the pool counters of the engine.
+
+    :param name: The engine label of the metrics
+    :param database_engine: The engine to instrument
+    """
+    instrumented_engines[name] = database_engine
+    sync_engine = database_engine.sync_engine
+    slow_query_threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(connection, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - connection.info["statement_started"].pop()
+        DB_STATEMENT_DURATION.observe(duration, name, statement_operation(statement))
+        account_statement(duration)
+        if slow_query_threshold and duration >= slow_query_threshold:
+            logger.warning(
+                "Slow statement on %s took %.1fms: %s parameters=%s",
+                name,
+                duration * 1000,
+                statement,
+                redact_parameters(parameters, executemany),
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def count_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("statement_started"):
+            account_statement(
+                time.perf_counter() - connection.info["statement_started"].pop()
+            )
+        DB_STATEMENT_ERRORS.inc(name)
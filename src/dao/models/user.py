@@ -1,10 +1,20 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, func, String
-from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, INTEGER
+from sqlalchemy import Column, Computed, func, Index, String
+from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, INTEGER, TSVECTOR
+from sqlalchemy.orm import deferred
 import uuid
 
 Base = declarative_base()
 
+# Text columns matched by the user search, each backed by a pg_trgm GIN index
+SEARCHABLE_COLUMNS = ("first_name", "last_name", "email", "phone_number")
+
+SEARCH_VECTOR_EXPRESSION = (
+    "to_tsvector('simple', "
+    + " || ' ' || ".join(f"coalesce({column}, '')" for column in SEARCHABLE_COLUMNS)
+    + ")"
+)
+
 
 class User(Base):
     """This class maps to a table user that holds
@@ -35,3 +45,28 @@ class User(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+    # Generated by postgres from the searchable columns, never loaded by default
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        )
+    )
+
+    # (sort column, id) indexes backing the keyset pagination of user listings
+    __table_args__ = (
+        Index("ix_user_created_at_id", "created_at", "id"),
+        Index("ix_user_updated_at_id", "updated_at", "id"),
+        Index("ix_user_first_name_id", "first_name", "id"),
+        Index("ix_user_last_name_id", "last_name", "id"),
+        Index("ix_user_search_vector", "search_vector", postgresql_using="gin"),
+        *[
+            Index(
+                f"ix_user_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in SEARCHABLE_COLUMNS
+        ],
+    )
@@ -1,12 +1,48 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncpg
+import json
 from sqlalchemy.future import select
-from src.dao.models.user import User
+from src.dao.models.user import SEARCHABLE_COLUMNS, User
 from src.dto.user import UserCreate, UserUpdate
 from uuid import UUID
-from src.utils.constants import Status
-from typing import Optional
-from sqlalchemy import or_
-from src.dao.models.user import User
+from src.utils.constants import (
+    BULK_CHUNK_SIZE,
+    EXPORT_BATCH_SIZE,
+    SEARCH_RELEVANCE_SORT,
+    Status,
+)
+from typing import List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy import (
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY
+from src.exceptions.user import InvalidCursor, InvalidSortingAttribute
+from src.utils.utils import decode_cursor, encode_cursor, escape_like
+
+# Columns filled by a user import, the database fills the timestamps
+IMPORT_COLUMNS = [
+    "id",
+    "first_name",
+    "last_name",
+    "gender",
+    "email",
+    "phone_number",
+    "status",
+]
+IMPORT_STAGING_TABLE = "user_import_staging"
+
+# Columns of the user listings, read as plain rows instead of tracked ORM instances
+LIST_COLUMNS = [column for column in User.__table__.columns if column.computed is None]
 
 # For synchronous manner
 # from sqlalchemy.orm import Session
@@ -33,17 +69,31 @@ class UserDAO:
     #     result = db_obj.query(User).filter(User.id == user_id)
     #     return result.first()
 
-    async def create_user(db_obj: AsyncSession, user: UserCreate):
+    async def get_users(db_obj: AsyncSession, user_ids: List[UUID]):
         """
-        This function creates a user in the database.
+        This function gets the LIST_COLUMNS of many users as Core rows, with a
+        single SELECT ... WHERE id = ANY(...) statement.
+        :param user_ids: ids of the users.
+        :param db_obj: database object
+
+        :return: rows of the existing users, in no particular order
+        """
+        ids = bindparam("user_ids", user_ids, type_=ARRAY(User.id.type))
+        result = await db_obj.execute(select(*LIST_COLUMNS).where(User.id == any_(ids)))
+        return result.all()
 
-        :param user: User creation request payload schema.
+    async def create_user(db_obj: AsyncSession, user: dict):
+        """
+        This function creates a user in the database with a single INSERT ... RETURNING
+        statement, which also reads back the server side defaults.
+
+        :param user: column values of the user to create.
         :param db_obj: database object
+
+        :return: the created user
         """
-        db_user = User(**user.dict())
-        db_obj.add(db_user)
-        await db_obj.refresh(db_user)
-        return db_user
+        result = await db_obj.execute(insert(User).values(**user).returning(User))
+        return result.scalars().one()
 
     # def create_user(db_obj: Session, user: UserCreate):
     #     """
@@ -57,20 +107,95 @@ class UserDAO:
     #     db_obj.refresh(db_user)
     #     return db_user
 
+    async def bulk_create_users(
+        db_obj: AsyncSession, users: List[dict], chunk_size: int = BULK_CHUNK_SIZE
+    ):
+        """
+        This function creates many users in the database, sending one multi-row
+        INSERT ... RETURNING statement per chunk of users.
+
+        :param users: column values of the users to create.
+        :param chunk_size: number of users inserted per statement.
+        :param db_obj: database object
+
+        :return: the created users in the order they were given
+        """
+        created_users = []
+        for start in range(0, len(users), chunk_size):
+            result = await db_obj.scalars(
+                insert(User).returning(User, sort_by_parameter_order=True),
+                users[start : start + chunk_size],
+            )
+            created_users.extend(result.all())
+        return created_users
+
+    async def create_import_staging(connection: asyncpg.Connection):
+        """
+        This function creates the temporary staging table of a user import. The
+        table is dropped when the import transaction ends.
+
+        :param connection: asyncpg connection inside the import transaction
+        """
+        columns = ", ".join(
+            f"{column} {User.__table__.c[column].type.compile(dialect=postgresql.dialect())}"
+            for column in IMPORT_COLUMNS
+        )
+        await connection.execute(
+            f"CREATE TEMPORARY TABLE {IMPORT_STAGING_TABLE} ({columns}) ON COMMIT DROP"
+        )
+
+    async def copy_into_import_staging(
+        connection: asyncpg.Connection, records: List[tuple]
+    ):
+        """
+        This function streams validated users into the staging table with COPY.
+
+        :param records: user values ordered as IMPORT_COLUMNS
+        :param connection: asyncpg connection inside the import transaction
+        """
+        await connection.copy_records_to_table(
+            IMPORT_STAGING_TABLE, records=records, columns=IMPORT_COLUMNS
+        )
+
+    async def merge_import_staging(connection: asyncpg.Connection):
+        """
+        This function moves the staged users into the user table in one statement,
+        letting the database fill created_at and updated_at.
+
+        :param connection: asyncpg connection inside the import transaction
+
+        :return: number of imported users
+        """
+        columns = ", ".join(IMPORT_COLUMNS)
+        command_status = await connection.execute(
+            f'INSERT INTO "{User.__tablename__}" ({columns}) '
+            f"SELECT {columns} FROM {IMPORT_STAGING_TABLE}"
+        )
+        # asyncpg returns the command tag, e.g. "INSERT 0 5000"
+        return int(command_status.rsplit(" ", 1)[-1])
+
     async def update_user(db_obj: AsyncSession, user_id: UUID, user: UserUpdate):
         """
-        This function update a user details in the database.
+        This function update a user details in the database with a single
+        UPDATE ... RETURNING statement.
 
         :param user: User update request payload schema.
         :param user_id: Id of the user to be updated .
         :param db_obj: database object
+
+        :return: the updated user or None when it does not exist
         """
-        db_user = await user_dao.get_user(db_obj, user_id)
-        if db_user:
-            for key, value in user.dict(exclude_unset=True).items():
-                setattr(db_user, key, value)
-            await db_obj.refresh(db_user)
-        return db_user
+        values = user.model_dump(exclude_unset=True)
+        if not values:
+            return await UserDAO.get_user(user_id=user_id, db_obj=db_obj)
+        result = await db_obj.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(**values)
+            .returning(User)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalars().first()
 
     # def update_user(db_obj: Session, user_id: UUID, user: UserUpdate):
     #     """
@@ -90,15 +215,20 @@ class UserDAO:
 
     async def delete_user(db_obj: AsyncSession, user_id: UUID):
         """
-        This function deletes the user details from the database.
+        This function deletes the user details from the database with a single
+        DELETE ... RETURNING statement.
         :param user_id: Id of the user to be deleted.
         :param db_obj: database object
 
+        :return: id of the deleted user or None when it does not exist
         """
-        db_user = await user_dao.get_user(db_obj, user_id)
-        if db_user:
-            await db_obj.delete(db_user)
-        return db_user
+        result = await db_obj.execute(
+            delete(User)
+            .where(User.id == user_id)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalars().first()
 
     # def delete_user(db_obj: Session, user_id: UUID):
     #     """
@@ -121,42 +251,275 @@ class UserDAO:
         sort_order: Optional[str] = "asc",
         limit: Optional[int] = 10,
         offset: Optional[int] = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
     ):
         """
         The all_user function is used to retrieve all the users in the database.
         It takes in a number of parameters that are used to filter and sort the results.
+        When a cursor is given the page seeks on (sort_by column, id) instead of
+        skipping `offset` rows, so deep pages cost the same as the first one.
+        Only the LIST_COLUMNS are selected, as Core rows that skip the ORM identity map,
+        or the requested fields plus id, updated_at and the sort column.
         :param search: Used to searching
         :param sort_order: Determine if the query should be sorted in ascending or descending order
         :param sort_by: Sort the results by a particular column
         :param limit: Limit the number of results returned
-        :param offset: Skip the first n records
+        :param offset: Skip the first n records, ignored when a cursor is given
+        :param cursor: Opaque cursor returned as next_cursor by the previous page
+        :param fields: names of the columns to select, None for every LIST_COLUMNS
         :param db_obj: database object
 
-        :return: all user by applying filter and sorting
+        :return: tuple of the user rows by applying filter and sorting and the next_cursor
         """
-        query = select(User)
+        search = search.strip() if search else None
+        by_relevance = sort_by == SEARCH_RELEVANCE_SORT
+        if by_relevance and not search:
+            raise InvalidSortingAttribute(sort_by)
+        sort_column = None if by_relevance else UserDAO.sort_column(sort_by)
+        descending = sort_order == "desc"
+        columns = LIST_COLUMNS
+        if fields is not None:
+            # id and the sort column position the cursor, updated_at versions the rows
+            selected = {*fields, User.id.key, User.updated_at.key}
+            if sort_column is not None:
+                selected.add(sort_column.key)
+            columns = [column for column in LIST_COLUMNS if column.key in selected]
+        query = select(*columns)
 
         if search:
-            query = query.where(
-                or_(
-                    User.gender.ilike(f"%{search}%"),
-                    User.email.ilike(f"%{search}%"),
-                    User.first_name.ilike(f"%{search}%"),
-                    User.last_name.ilike(f"%{search}%"),
-                    User.phone_number.ilike(f"%{search}%"),
-                    User.status.ilike(f"%{search}%"),
+            query = query.where(UserDAO.search_condition(search))
+
+        if cursor is not None:
+            if by_relevance:
+                raise InvalidCursor(
+                    f"Cursor pagination is not supported when sorting by '{sort_by}'"
                 )
+            query = query.where(
+                UserDAO.keyset_condition(sort_by, sort_order, sort_column, cursor)
+            )
+        elif offset:
+            query = query.offset(offset)
+
+        if by_relevance:
+            query = query.order_by(UserDAO.search_rank(search).desc(), User.id.asc())
+        else:
+            # id breaks ties so that every page boundary is deterministic
+            order_columns = [User.id]
+            if sort_column is not None and sort_column is not User.id:
+                order_columns.insert(0, sort_column)
+            query = query.order_by(
+                *[
+                    column.desc() if descending else column.asc()
+                    for column in order_columns
+                ]
             )
 
-        if sort_by:
-            if sort_order == "asc":
-                query = query.order_by(getattr(User, sort_by).asc())
-            elif sort_order == "desc":
-                query = query.order_by(getattr(User, sort_by).desc())
-
-        query = query.limit(limit).offset(offset)
+        if limit is not None:
+            # One extra row tells whether another page exists without a second query
+            query = query.limit(limit + 1)
         result = await db_obj.execute(query)
-        return result.scalars().all()
+        users = result.all()
+
+        next_cursor = None
+        if limit is not None and len(users) > limit:
+            users = users[:limit]
+            if not by_relevance and UserDAO.supports_keyset(sort_column):
+                next_cursor = UserDAO.encode_position(sort_by, sort_order, users[-1])
+        return users, next_cursor
+
+    async def count_users(db_obj: AsyncSession, search: Optional[str] = None):
+        """
+        The count_users function counts the users, or the ones matching the search,
+        with the same filter as all_user.
+        :param search: Used to searching
+        :param db_obj: database object
+
+        :return: exact number of users
+        """
+        query = select(func.count()).select_from(User)
+        search = search.strip() if search else None
+        if search:
+            query = query.where(UserDAO.search_condition(search))
+        return await db_obj.scalar(query)
+
+    async def estimate_users(db_obj: AsyncSession, search: Optional[str] = None):
+        """
+        The estimate_users function reads the planner estimate of the number of users,
+        or of the ones matching the search, without scanning the table. The estimate
+        is as fresh as the last ANALYZE of the table.
+        :param search: Used to searching
+        :param db_obj: database object
+
+        :return: estimated number of users
+        """
+        search = search.strip() if search else None
+        if not search:
+            # the table is resolved through the search_path, like the queries
+            reltuples = await db_obj.scalar(
+                text(
+                    "SELECT reltuples FROM pg_class "
+                    "WHERE oid = CAST(:table_name AS regclass)"
+                ),
+                {"table_name": f'"{User.__tablename__}"'},
+            )
+            # -1 until the table is first vacuumed or analyzed
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+
+        query = select(User.id)
+        if search:
+            query = query.where(UserDAO.search_condition(search))
+        connection = await db_obj.connection()
+        compiled = query.compile(dialect=connection.dialect)
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", parameters
+        )
+        plan = result.scalar()
+        # asyncpg returns json as text
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def stream_users(
+        db_obj: AsyncSession,
+        search: Optional[str] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ):
+        """
+        The stream_users function reads the LIST_COLUMNS of the users as Core rows
+        through a server side cursor, holding at most batch_size users in memory at a time.
+        :param search: Used to searching
+        :param batch_size: number of users fetched per round-trip
+        :param db_obj: database object
+
+        :return: async iterator over lists of at most batch_size user rows, ordered by id
+        """
+        query = (
+            select(*LIST_COLUMNS)
+            .order_by(User.id)
+            .execution_options(yield_per=batch_size)
+        )
+        search = search.strip() if search else None
+        if search:
+            query = query.where(UserDAO.search_condition(search))
+
+        result = await db_obj.stream(query)
+        async for users in result.partitions():
+            yield users
+
+    def sort_column(sort_by: Optional[str]):
+        """
+        Resolve the column used for sorting the user listing.
+        :param sort_by: name of the user column
+
+        :return: the sort column or None when no sorting is requested
+        """
+        if not sort_by:
+            return None
+        column = User.__table__.columns.get(sort_by)
+        if column is None or column.computed is not None:
+            raise InvalidSortingAttribute(sort_by)
+        return getattr(User, sort_by)
+
+    def search_condition(search: str):
+        """
+        Build the search predicate. Every branch is served by a GIN index: the
+        tsvector matches whole words across the searchable columns (e.g. a full
+        name) and the pg_trgm indexes serve the substring match on each column.
+        :param search: the search term
+
+        :return: where clause matching the users for the search term
+        """
+        pattern = f"%{escape_like(search)}%"
+        return or_(
+            User.search_vector.bool_op("@@")(
+                func.websearch_to_tsquery("simple", search)
+            ),
+            *[
+                getattr(User, column).ilike(pattern, escape="\\")
+                for column in SEARCHABLE_COLUMNS
+            ],
+        )
+
+    def search_rank(search: str):
+        """
+        Relevance of a user for the search term, the full text rank plus the best
+        trigram similarity among the searchable columns.
+        :param search: the search term
+
+        :return: sql expression of the relevance
+        """
+        return func.ts_rank(
+            User.search_vector, func.websearch_to_tsquery("simple", search)
+        ) + func.greatest(
+            *[
+                func.similarity(getattr(User, column), search)
+                for column in SEARCHABLE_COLUMNS
+            ]
+        )
+
+    def supports_keyset(sort_column):
+        """
+        Keyset pagination needs a total order, so it is only offered on non nullable columns.
+        :param sort_column: the column used for sorting
+
+        :return: True when a cursor can be built for the sort column
+        """
+        return sort_column is None or not sort_column.nullable
+
+    def encode_position(sort_by: Optional[str], sort_order: Optional[str], user: User):
+        """
+        Build the cursor pointing right after the given user.
+        :param sort_by: Sort column of the listing
+        :param sort_order: Sort order of the listing
+        :param user: last user of the current page
+
+        :return: opaque cursor
+        """
+        value = getattr(user, sort_by) if sort_by and sort_by != "id" else None
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return encode_cursor(
+            {"s": sort_by, "o": sort_order, "v": value, "id": str(user.id)}
+        )
+
+    def keyset_condition(
+        sort_by: Optional[str], sort_order: Optional[str], sort_column, cursor: str
+    ):
+        """
+        Build the seek predicate for the rows following the cursor position.
+        :param sort_by: Sort column of the listing
+        :param sort_order: Sort order of the listing
+        :param sort_column: the resolved sort column
+        :param cursor: opaque cursor of the previous page
+
+        :return: where clause on (sort column, id)
+        """
+        if not UserDAO.supports_keyset(sort_column):
+            raise InvalidCursor(
+                f"Cursor pagination is not supported when sorting by '{sort_by}'"
+            )
+        try:
+            position = decode_cursor(cursor)
+            if position.get("s") != sort_by or position.get("o") != sort_order:
+                raise InvalidCursor("Cursor does not match the requested sorting")
+            last_id = UUID(position["id"])
+            last_value = position["v"]
+            if sort_column is not None and sort_column is not User.id:
+                if sort_column.type.python_type is datetime:
+                    last_value = datetime.fromisoformat(last_value)
+                elif not isinstance(last_value, sort_column.type.python_type):
+                    raise ValueError("Cursor value does not match the sort column")
+        except (KeyError, TypeError, ValueError):
+            raise InvalidCursor()
+
+        if sort_column is None or sort_column is User.id:
+            return User.id < last_id if sort_order == "desc" else User.id > last_id
+        if sort_order == "desc":
+            return tuple_(sort_column, User.id) < tuple_(last_value, last_id)
+        return tuple_(sort_column, User.id) > tuple_(last_value, last_id)
 
     # def all_user(
     #     db_obj: Session,
@@ -206,19 +569,87 @@ class UserDAO:
 
     async def update_status(db_obj: AsyncSession, user_id: UUID, new_status: Status):
         """
-        The update_status function is used to update the status of user for the given user id.
+        The update_status function is used to update the status of user for the given user id,
+        with a single UPDATE ... RETURNING statement.
 
         :param user_id: Get the user details by id
         :param new_status: Updated new user status
         :param db_obj: database object
 
+        :return: the updated user or None when it does not exist
         """
-        db_user = await user_dao.get_user(db_obj, user_id)
-        if db_user:
-            db_user.status = new_status
-            await db_obj.refresh(db_user)
-            return db_user
-        return None
+        result = await db_obj.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(status=new_status)
+            .returning(User)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalars().first()
+
+    async def bulk_update_status(
+        db_obj: AsyncSession, user_ids: List[UUID], new_status: Status
+    ):
+        """
+        The bulk_update_status function sets the status of the given users with a
+        single UPDATE ... WHERE id = ANY(...) statement. Users already having the
+        status are left untouched.
+
+        :param user_ids: ids of the users to update
+        :param new_status: Updated new user status
+        :param db_obj: database object
+
+        :return: ids of the updated users
+        """
+        ids = bindparam("user_ids", user_ids, type_=ARRAY(User.id.type))
+        result = await db_obj.execute(
+            update(User)
+            .where(User.id == any_(ids), User.status != new_status)
+            .values(status=new_status)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalars().all()
+
+    async def bulk_update_status_matching(
+        db_obj: AsyncSession,
+        new_status: Status,
+        current_status: Optional[Status] = None,
+        created_before: Optional[datetime] = None,
+        created_after: Optional[datetime] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ):
+        """
+        The bulk_update_status_matching function sets the status of at most
+        chunk_size users matching the filter and not having the status yet.
+        Calling it until it updates less than chunk_size users covers them all.
+
+        :param new_status: Updated new user status
+        :param current_status: only update the users having this status
+        :param created_before: only update the users created before this time
+        :param created_after: only update the users created after this time
+        :param chunk_size: maximum number of users updated
+        :param db_obj: database object
+
+        :return: ids of the updated users
+        """
+        conditions = [User.status != new_status]
+        if current_status is not None:
+            conditions.append(User.status == current_status)
+        if created_before is not None:
+            conditions.append(User.created_at < created_before)
+        if created_after is not None:
+            conditions.append(User.created_at > created_after)
+
+        chunk = select(User.id).where(*conditions).limit(chunk_size)
+        result = await db_obj.execute(
+            update(User)
+            .where(User.id.in_(chunk.scalar_subquery()))
+            .values(status=new_status)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalars().all()
 
     # def update_status(db_obj: Session, user_id: UUID, new_status: Status):
     #     """
@@ -0,0 +1,43 @@
+"""This module handles request body, response body and field validation"""
+
+from fastapi_camelcase import CamelModel
+from pydantic import Field
+
+
+class PoolStatusResponse(CamelModel):
+    name: str = Field(..., title="Name", description="The database engine name")
+    size: int = Field(..., title="Size", description="The configured pool size")
+    checked_in: int = Field(
+        ..., title="Checked In", description="Idle connections held by the pool"
+    )
+    checked_out: int = Field(
+        ..., title="Checked Out", description="Connections currently in use"
+    )
+    overflow: int = Field(
+        ..., title="Overflow", description="Connections opened beyond the pool size"
+    )
+    max_overflow: int = Field(
+        ..., title="Max Overflow", description="The allowed overflow connections"
+    )
+
+
+class CacheStatsResponse(CamelModel):
+    name: str = Field(..., title="Name", description="The cache name")
+    backend: str = Field(..., title="Backend", description="The cache backend")
+    size: int = Field(..., title="Size", description="The cached entries")
+    max_size: int = Field(
+        ..., title="Max Size", description="The maximum number of cached entries"
+    )
+    ttl_seconds: float = Field(
+        ..., title="TTL Seconds", description="Seconds an entry stays valid"
+    )
+    hits: int = Field(..., title="Hits", description="Reads served from the cache")
+    misses: int = Field(
+        ..., title="Misses", description="Reads that found no valid entry"
+    )
+    evictions: int = Field(
+        ..., title="Evictions", description="Entries dropped to stay within max size"
+    )
+    expirations: int = Field(
+        ..., title="Expirations", description="Entries dropped once expired"
+    )
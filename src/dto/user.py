@@ -1,8 +1,8 @@
 """This module handles request body, response body and field validation"""
 
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from fastapi_camelcase import CamelModel
-from pydantic import Field, EmailStr
+from pydantic import Field, EmailStr, model_validator
 from uuid import UUID
 from datetime import datetime
 
@@ -84,3 +84,100 @@ class UserUpdateStatus(CamelModel):
         title="User status",
         description="User status to check if they are disable, enable or blocked.",
     )
+
+
+class UserListPage(CamelModel):
+    items: List[UserResponse] = Field(
+        ..., title="Items", description="The users of the requested page"
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Next Cursor",
+        description="Opaque cursor of the following page, None on the last page",
+    )
+    total: Optional[int] = Field(
+        None,
+        title="Total",
+        description="Exact or estimated number of matching users, None when not requested",
+    )
+
+
+class UserBatchGet(CamelModel):
+    ids: List[UUID] = Field(
+        ..., title="IDs", description="The unique identifiers of the users to get"
+    )
+
+
+class UserBulkError(CamelModel):
+    index: int = Field(
+        ...,
+        title="Index",
+        description="The position of the rejected user in the request",
+    )
+    errors: List[Dict[str, Any]] = Field(
+        ..., title="Errors", description="The validation errors of the rejected user"
+    )
+
+
+class UserBulkCreateResponse(CamelModel):
+    created: List[UserResponse] = Field(
+        ..., title="Created", description="The created users in request order"
+    )
+    errors: List[UserBulkError] = Field(
+        ..., title="Errors", description="The users rejected by validation"
+    )
+
+
+class UserStatusFilter(CamelModel):
+    current_status: Optional[int] = Field(
+        None, title="Current Status", description="Only users having this status"
+    )
+    created_before: Optional[datetime] = Field(
+        None, title="Created Before", description="Only users created before this time"
+    )
+    created_after: Optional[datetime] = Field(
+        None, title="Created After", description="Only users created after this time"
+    )
+    all: bool = Field(
+        False,
+        title="All",
+        description="Update every user, exclusive with the other criteria",
+    )
+
+    @model_validator(mode="after")
+    def check_criteria(self):
+        has_criteria = any(
+            value is not None
+            for value in (self.current_status, self.created_before, self.created_after)
+        )
+        if has_criteria == self.all:
+            raise ValueError(
+                "Give either at least one criterion or all to update every user"
+            )
+        return self
+
+
+class UserBulkUpdateStatus(CamelModel):
+    status: int = Field(
+        ...,
+        title="User status",
+        description="User status to check if they are disable, enable or blocked.",
+    )
+    ids: Optional[List[UUID]] = Field(
+        None, title="IDs", description="The users to update, exclusive with filter"
+    )
+    filter: Optional[UserStatusFilter] = Field(
+        None, title="Filter", description="The users to update, exclusive with ids"
+    )
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Exactly one of ids or filter must be given")
+        return self
+
+
+class UserBulkStatusResponse(CamelModel):
+    updated: int = Field(
+        ..., title="Updated", description="The number of users whose status changed"
+    )
@@ -37,3 +37,36 @@ class InvalidStatusAttribute(HTTPException):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid attribute '{attribute}' for status",
         )
+
+
+class InvalidFieldsAttribute(HTTPException):
+    """
+    Exception raised when a field requested in `fields` is not part of the response.
+    """
+
+    def __init__(self, attribute: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid attribute '{attribute}' for fields",
+        )
+
+
+class InvalidCursor(HTTPException):
+    """
+    Exception raised when the provided pagination cursor is invalid.
+    """
+
+    def __init__(self, detail: str = "Invalid pagination cursor"):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class BulkSizeExceeded(HTTPException):
+    """
+    Exception raised when a bulk request carries more items than allowed.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A bulk request accepts at most {limit} items",
+        )
@@ -0,0 +1,250 @@
+"""Entity caches used by the service layer"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from src.core.config import settings
+
+
+class CacheBackend(ABC):
+    """
+    Interface of the caches used by the services. The methods are async so that a
+    shared backend, such as a Redis compatible store, can replace the in-process one.
+    """
+
+    @abstractmethod
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """
+        This function reads a cached value.
+
+        :param key: The cache key
+        :return: The cached value, None when it is missing or expired
+        """
+
+    @abstractmethod
+    async def set(self, key: Hashable, value: Any):
+        """
+        This function caches a value.
+
+        :param key: The cache key
+        :param value: The value to cache, never None
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: Hashable):
+        """
+        This function drops cached values, missing keys are ignored.
+
+        :param keys: The cache keys
+        """
+
+    @abstractmethod
+    async def clear(self):
+        """
+        This function drops every cached value.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """
+        This function reads the counters of the cache.
+
+        :return: Dictionary with the cache counters
+        """
+
+
+class NullCache(CacheBackend):
+    """Cache that stores nothing, used when caching is disabled"""
+
+    def __init__(self):
+        self.misses = 0
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        self.misses += 1
+        return None
+
+    async def set(self, key: Hashable, value: Any):
+        pass
+
+    async def delete(self, *keys: Hashable):
+        pass
+
+    async def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "none",
+            "size": 0,
+            "max_size": 0,
+            "ttl_seconds": 0.0,
+            "hits": 0,
+            "misses": self.misses,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+
+class LRUTTLCache(CacheBackend):
+    """
+    In-process cache bounded to max_size entries, evicting the least recently used
+    one when full. Entries expire ttl_seconds after they were set. Every worker
+    process holds its own copy, so the TTL also bounds how long a write made
+    through another worker can be served stale.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: Hashable):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "lru-ttl",
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class WriteGeneration:
+    """
+    Counter bumped after every committed write. Cache keys embedding it stop
+    matching once a write happens, so results read before it are never served.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.bumped_at = float("-inf")
+
+    def bump(self):
+        self.value += 1
+        self.bumped_at = time.monotonic()
+
+    def bumped_within(self, seconds: float) -> bool:
+        """
+        This function tells whether a write happened recently.
+
+        :param seconds: The length of the window, in seconds
+        :return: True when the last write is less than seconds old
+        """
+        return time.monotonic() - self.bumped_at < seconds
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call for
+    their key is in flight wait for its result instead of making their own.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]):
+        """
+        This function runs func, or waits for the call of func already in flight for the key.
+
+        :param key: The key identifying identical calls
+        :param func: The coroutine function to run
+        :return: The result of func
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # a waiter being cancelled must not cancel the call of the others
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as call_exception:
+            future.set_exception(call_exception)
+            # retrieved here, so that it is not logged when nobody was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+def create_cache(enabled: bool, max_size: int, ttl_seconds: float) -> CacheBackend:
+    """
+    This function creates the cache of an entity, or a NullCache when caching is disabled.
+
+    :param enabled: Whether the cache is enabled
+    :param max_size: The maximum number of cached entries
+    :param ttl_seconds: Seconds an entry stays valid
+    :return: The cache backend
+    """
+    if not enabled or max_size <= 0:
+        return NullCache()
+    return LRUTTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+
+user_cache = create_cache(
+    enabled=settings.USER_CACHE_ENABLED,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+
+user_count_cache = create_cache(
+    enabled=settings.USER_COUNT_CACHE_TTL_SECONDS > 0,
+    max_size=settings.USER_COUNT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_COUNT_CACHE_TTL_SECONDS,
+)
+
+user_list_cache = create_cache(
+    enabled=settings.USER_LIST_CACHE_TTL_SECONDS > 0,
+    max_size=settings.USER_LIST_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_LIST_CACHE_TTL_SECONDS,
+)
+user_list_flight = SingleFlight()
+
+# bumped by every user write of this worker process
+user_write_generation = WriteGeneration()
@@ -1,33 +1,135 @@
 from src.dto.user import UserCreate, UserUpdate, UserResponse, UserUpdateStatus
 from src.dao.models.user import User
+from src.exceptions.user import InvalidFieldsAttribute
 from src.utils.constants import Status
 from fastapi.encoders import jsonable_encoder
+from typing import Any, List, Optional, Sequence
+from uuid import UUID
+from datetime import datetime
+from sqlalchemy.engine import Row
+import csv
+import io
+import orjson
+
+# (field name, camelCase alias) of every UserResponse field, in response order
+USER_RESPONSE_ALIASES = tuple(
+    (name, field.alias or name) for name, field in UserResponse.model_fields.items()
+)
+
+# UserResponse field names by alias and by name, for the `fields` query parameter
+USER_RESPONSE_NAMES = {
+    **{alias: name for name, alias in USER_RESPONSE_ALIASES},
+    **{name: name for name, _ in USER_RESPONSE_ALIASES},
+}
+
+# datetimes in UTC are written with a Z suffix, like pydantic does
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def json_default(value: Any):
+    """
+    Encode the values orjson does not support natively, e.g. the UUID subclass of asyncpg.
+    :param value: The value to encode
+    :return: JSON serializable value
+    """
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def csv_value(value: Any):
+    """
+    Format a column value for CSV like it is written in JSON, datetimes in ISO 8601.
+    :param value: The column value
+    :return: The value for the csv writer
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return value
 
 
 class Converter:
 
-    def user_db_to_dto(user: UserResponse):
+    def user_db_to_dto(user: User):
         """
-        Convert a User database model to a UserResponse DTO.
+        Convert a User database model to a UserResponse DTO. The database row is
+        trusted, so the DTO is built without running the field validators again.
         :param user: User database model
         :return: UserResponse DTO
         """
         # user_dict = jsonable_encoder(user)
         # return UserResponse(**user_dict)
-        return User(
-            id=user.id,
-            address_id=user.address_id,
-            user_role_id=user.user_role_id,
-            contact=user.contact,
-            email=user.email,
-            password=user.password,
-            username=user.username,
-            image=user.image,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            gender=user.gender,
-            dob=user.dob,
-            is_active=user.is_active,
+        return UserResponse.model_construct(
+            **{name: getattr(user, name) for name, _ in USER_RESPONSE_ALIASES}
+        )
+
+    def user_rows_to_dtos(rows: List[Row]):
+        """
+        Convert a whole result set of user rows to UserResponse DTOs in one pass.
+        The column names are read once, the DTOs only carry the selected columns.
+        :param rows: User rows selected with UserResponse columns
+        :return: List of UserResponse DTOs
+        """
+        if not rows:
+            return []
+        fields = rows[0]._fields
+        # shared by the DTOs of the page, which all hold the same fields
+        fields_set = set(fields)
+        construct = UserResponse.model_construct
+        return [
+            construct(_fields_set=fields_set, **dict(zip(fields, row))) for row in rows
+        ]
+
+    def parse_fields(fields: Optional[str]):
+        """
+        Parse the `fields` query parameter into UserResponse field names.
+        :param fields: Comma separated field aliases or names
+        :return: Tuple of the field names in response order, None for every field
+        """
+        if not fields or not fields.strip():
+            return None
+        requested = set()
+        for field in fields.split(","):
+            field = field.strip()
+            if not field:
+                continue
+            if field not in USER_RESPONSE_NAMES:
+                raise InvalidFieldsAttribute(field)
+            requested.add(USER_RESPONSE_NAMES[field])
+        return tuple(name for name, _ in USER_RESPONSE_ALIASES if name in requested)
+
+    def user_to_dict(user: Any, aliases: Sequence[tuple] = USER_RESPONSE_ALIASES):
+        """
+        Convert a User database model or a UserResponse DTO to its JSON object, keyed by the aliases.
+        :param user: User database model or UserResponse DTO
+        :param aliases: (field name, alias) of the fields to output
+        :return: Dictionary of the response fields
+        """
+        return {alias: getattr(user, name) for name, alias in aliases}
+
+    def users_to_json(users: Any, fields: Optional[Sequence[str]] = None):
+        """
+        Encode a user, or a list of users, as the JSON body of a response with orjson.
+        :param users: User database model or UserResponse DTO, or a list of them
+        :param fields: Names of the fields to output, None for every field
+        :return: JSON encoded response body
+        """
+        aliases = USER_RESPONSE_ALIASES
+        if fields is not None:
+            aliases = tuple(
+                (name, alias) for name, alias in USER_RESPONSE_ALIASES if name in fields
+            )
+        if isinstance(users, list):
+            return orjson.dumps(
+                [Converter.user_to_dict(user, aliases) for user in users],
+                default=json_default,
+                option=JSON_OPTIONS,
+            )
+        return orjson.dumps(
+            Converter.user_to_dict(users, aliases),
+            default=json_default,
+            option=JSON_OPTIONS,
         )
 
     def user_create_dto_to_db(user_create: UserCreate):
@@ -45,6 +147,21 @@ class Converter:
             status=Status.ENABLED,
         )
 
+    def user_create_dto_to_dict(user_create: UserCreate):
+        """
+        Convert a UserCreate DTO to the column values of a new user, for INSERT statements.
+        :param user_create: UserCreate DTO
+        :return: Dictionary of User column values
+        """
+        return {
+            "first_name": user_create.first_name,
+            "last_name": user_create.last_name,
+            "email": user_create.email,
+            "phone_number": user_create.phone_number,
+            "gender": user_create.gender,
+            "status": Status.ENABLED,
+        }
+
     def user_update_dto_to_db(user_update: UserUpdate, user: User):
         """
         Convert a UserUpdate DTO to a User database model (updating an existing user).
@@ -65,3 +182,37 @@ class Converter:
         """
         user.status = user_update_status.status
         return user
+
+    def users_to_ndjson(users: List[User]):
+        """
+        Convert User database models or rows to NDJSON, one UserResponse document per line.
+        :param users: User database models or rows
+        :return: NDJSON encoded users
+        """
+        return b"".join(
+            orjson.dumps(
+                Converter.user_to_dict(user),
+                default=json_default,
+                option=JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE,
+            )
+            for user in users
+        )
+
+    def users_to_csv(users: List[User], header: bool = False):
+        """
+        Convert User database models or rows to CSV rows, with the UserResponse aliases as header.
+        :param users: User database models or rows
+        :param header: Whether to output the header line instead of the users
+        :return: CSV encoded users
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(
+                field.alias or name for name, field in UserResponse.model_fields.items()
+            )
+        for user in users:
+            writer.writerow(
+                csv_value(value) for value in Converter.user_to_dict(user).values()
+            )
+        return buffer.getvalue()
@@ -0,0 +1,178 @@
+"""This module imports users in bulk from CSV or NDJSON sources.
+
+Rows are read and validated one at a time, the valid ones are sent to a staging
+table with COPY every IMPORT_BATCH_SIZE rows and merged into the user table at
+the end, in a single transaction. Invalid rows are written to a reject file."""
+
+from typing import TextIO
+import csv
+import json
+import uuid
+
+from pydantic import ValidationError
+from sqlalchemy import INTEGER
+
+from src.dao.db import database
+from src.dao.models.user import User
+from src.dao.users import IMPORT_COLUMNS, UserDAO
+from src.dto.user import UserCreate
+from src.service.converter import Converter
+from src.utils.constants import IMPORT_BATCH_SIZE, ExportFormat
+
+# Maximum length of the text columns, checked before COPY so one row cannot fail a batch
+COLUMN_LENGTHS = {
+    column: User.__table__.c[column].type.length
+    for column in IMPORT_COLUMNS
+    if getattr(User.__table__.c[column].type, "length", None)
+}
+
+# Range of the INTEGER columns, checked for the same reason
+INTEGER_RANGE = (-(2**31), 2**31 - 1)
+INTEGER_COLUMNS = [
+    column
+    for column in IMPORT_COLUMNS
+    if isinstance(User.__table__.c[column].type, INTEGER)
+]
+
+
+def read_rows(source: TextIO, import_format: ExportFormat):
+    """
+    Lazily parse the source, yielding one raw row at a time.
+    :param source: Text stream of the CSV or NDJSON document
+    :param import_format: The format of the source
+    :return: Iterator over (line number, row, parse error) tuples
+    """
+    if import_format == ExportFormat.CSV:
+        reader = csv.DictReader(source)
+        for row in reader:
+            # Empty CSV cells stand for missing optional values
+            yield reader.line_num, {
+                key: value if value != "" else None for key, value in row.items()
+            }, None
+        return
+
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as decode_error:
+            yield line_number, line.rstrip("\n"), str(decode_error)
+            continue
+        if not isinstance(row, dict):
+            yield line_number, row, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+def column_length_errors(values: dict):
+    """
+    Check the text values of a new user against the column sizes of the user table.
+    :param values: The column values of the user
+    :return: The list of errors, empty when every value fits
+    """
+    return [
+        {"loc": [column], "msg": f"At most {length} characters are allowed"}
+        for column, length in COLUMN_LENGTHS.items()
+        if values[column] is not None and len(values[column]) > length
+    ]
+
+
+def column_range_errors(values: dict):
+    """
+    Check the integer values of a new user against the range of the INTEGER columns.
+    :param values: The column values of the user
+    :return: The list of errors, empty when every value fits
+    """
+    low, high = INTEGER_RANGE
+    return [
+        {"loc": [column], "msg": f"Must be between {low} and {high}"}
+        for column in INTEGER_COLUMNS
+        if values[column] is not None and not low <= values[column] <= high
+    ]
+
+
+def column_errors(values: dict):
+    """
+    Check the values of a new user against the column types of the user table,
+    which would otherwise fail the whole statement writing it.
+    :param values: The column values of the user
+    :return: The list of errors, empty when every value fits
+    """
+    return column_length_errors(values) + column_range_errors(values)
+
+
+def validate_row(row: dict):
+    """
+    Validate a raw row against UserCreate and the column types of the user table.
+    :param row: The raw row
+    :return: The values of the row ordered as IMPORT_COLUMNS
+    :raises ValueError: With the list of errors when the row is invalid
+    """
+    try:
+        user_create = UserCreate.model_validate(row)
+    except ValidationError as validation_error:
+        raise ValueError(
+            validation_error.errors(include_url=False, include_context=False)
+        )
+
+    values = Converter.user_create_dto_to_dict(user_create)
+    values["id"] = uuid.uuid4()
+    errors = column_errors(values)
+    if errors:
+        raise ValueError(errors)
+    return tuple(values[column] for column in IMPORT_COLUMNS)
+
+
+def reject(reject_file: TextIO, line_number: int, row, errors):
+    """
+    Write a rejected row and its errors to the reject file as one NDJSON line.
+    """
+    reject_file.write(
+        json.dumps({"line": line_number, "row": row, "errors": errors}, default=str)
+        + "\n"
+    )
+
+
+async def import_users(
+    source: TextIO,
+    import_format: ExportFormat,
+    reject_file: TextIO,
+    batch_size: int = IMPORT_BATCH_SIZE,
+):
+    """
+    Import the users of a CSV or NDJSON source without buffering it, through COPY
+    into a staging table. Nothing is imported when the database fails.
+    :param source: Text stream of the document to import
+    :param import_format: The format of the source
+    :param reject_file: Text stream receiving the rejected rows
+    :param batch_size: Number of valid rows sent per COPY
+    :return: Dictionary with the number of imported and rejected users
+    """
+    imported = rejected = 0
+
+    async with database.engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        async with driver_connection.transaction():
+            await UserDAO.create_import_staging(driver_connection)
+            batch = []
+            for line_number, row, parse_error in read_rows(source, import_format):
+                if parse_error is not None:
+                    reject(reject_file, line_number, row, [{"msg": parse_error}])
+                    rejected += 1
+                    continue
+                try:
+                    batch.append(validate_row(row))
+                except ValueError as row_errors:
+                    reject(reject_file, line_number, row, row_errors.args[0])
+                    rejected += 1
+                    continue
+                if len(batch) >= batch_size:
+                    await UserDAO.copy_into_import_staging(driver_connection, batch)
+                    batch = []
+            if batch:
+                await UserDAO.copy_into_import_staging(driver_connection, batch)
+            imported = await UserDAO.merge_import_staging(driver_connection)
+
+    return {"imported": imported, "rejected": rejected}
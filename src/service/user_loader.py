@@ -0,0 +1,91 @@
+"""Request scoped batching of the user loads"""
+
+import asyncio
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.dao.users import UserDAO
+from src.dto.user import UserResponse
+from src.service.converter import Converter
+
+# Key of the loader in AsyncSession.info, the session carries one loader per request
+USER_LOADER_KEY = "user_loader"
+
+
+class UserLoader:
+    """
+    DataLoader of users bound to one session. The loads requested during the same
+    event loop tick are merged into a single SELECT ... WHERE id = ANY(...) sent
+    on the next tick, and each caller gets its own user back.
+    """
+
+    def __init__(self, db_obj: AsyncSession):
+        self.db_obj = db_obj
+        self._pending: Dict[UUID, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        # an AsyncSession runs one statement at a time
+        self._session_lock = asyncio.Lock()
+        self._batches = set()
+
+    @classmethod
+    def for_session(cls, db_obj: AsyncSession):
+        """
+        This function returns the loader of a session, creating it on first use.
+
+        :param db_obj: The session of the request
+        :return: The UserLoader of the session
+        """
+        loader = db_obj.info.get(USER_LOADER_KEY)
+        if loader is None:
+            loader = db_obj.info[USER_LOADER_KEY] = cls(db_obj)
+        return loader
+
+    def load(self, user_id: UUID) -> "asyncio.Future[Optional[UserResponse]]":
+        """
+        This function queues a user for the next batch, a user queued twice shares one future.
+
+        :param user_id: The ID of the user
+        :return: Future of the User DTO, None when the user does not exist
+        """
+        future = self._pending.get(user_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[user_id] = loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, user_ids: List[UUID]) -> List[Optional[UserResponse]]:
+        """
+        This function loads many users in one batch.
+
+        :param user_ids: The IDs of the users
+        :return: The User DTOs in the order of user_ids, None for the missing ones
+        """
+        return list(await asyncio.gather(*(self.load(user_id) for user_id in user_ids)))
+
+    def _dispatch(self):
+        batch, self._pending = self._pending, {}
+        self._dispatch_scheduled = False
+        task = asyncio.get_running_loop().create_task(self._fetch(batch))
+        # keeps the task referenced until it is done
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _fetch(self, batch: Dict[UUID, asyncio.Future]):
+        try:
+            async with self._session_lock:
+                rows = await UserDAO.get_users(db_obj=self.db_obj, user_ids=list(batch))
+        except Exception as database_exception:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(database_exception)
+            return
+
+        users = {user.id: user for user in Converter.user_rows_to_dtos(rows)}
+        for user_id, future in batch.items():
+            if not future.done():
+                future.set_result(users.get(user_id))
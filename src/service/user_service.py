@@ -1,17 +1,108 @@
-from src.dto.user import UserCreate, UserUpdate, UserUpdateStatus
+from src.dto.user import (
+    UserBulkCreateResponse,
+    UserBulkError,
+    UserBulkUpdateStatus,
+    UserCreate,
+    UserListPage,
+    UserUpdate,
+    UserUpdateStatus,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional, Sequence
+import asyncio
+import json
+from src.service.cache import (
+    user_cache,
+    user_count_cache,
+    user_list_cache,
+    user_list_flight,
+    user_write_generation,
+)
+from src.core.config import settings
 from src.service.converter import Converter
-from src.dao.db import transaction
+from src.service.user_import import column_errors
+from src.service.user_loader import UserLoader
+from src.dao.db import read_session, transaction
 from src.dao.users import UserDAO
+from src.exceptions.user import (
+    BulkSizeExceeded,
+    InvalidStatusAttribute,
+    UserNotFound,
+)
+from src.utils.constants import (
+    BATCH_GET_MAX_IDS,
+    BULK_CHUNK_SIZE,
+    BULK_MAX_ITEMS,
+    BULK_STATUS_MAX_IDS,
+    CountMode,
+    ExportFormat,
+    Status,
+)
 
 # Synchronous approach
 from sqlalchemy.orm import Session
 
 
+def user_cache_key(user_id: UUID) -> str:
+    """
+    This function builds the key of a user in the user cache.
+    :param user_id: The ID of the user
+    :return: The cache key
+    """
+    return f"user:{user_id}"
+
+
+def normalize_search(search: Optional[str]) -> str:
+    """
+    This function normalizes a search for the cache keys. The search is matched
+    case insensitively and stripped, so "Smith " and "smith" share their entries.
+    :param search: The search of the listing
+    :return: The normalized search
+    """
+    return search.strip().lower() if search else ""
+
+
+def user_count_cache_key(search: Optional[str]) -> str:
+    """
+    This function builds the key of a user count in the user count cache, valid
+    until the next user write.
+    :param search: The search of the listing
+    :return: The cache key
+    """
+    return f"user-count:{user_write_generation.value}:{normalize_search(search)}"
+
+
+def user_list_cache_key(**parameters) -> str:
+    """
+    This function builds the key of a page in the user list cache, valid until
+    the next user write.
+    :param parameters: The parameters of the listing, search is normalized
+    :return: The cache key
+    """
+    parameters["search"] = normalize_search(parameters.get("search"))
+    if parameters.get("cursor") is not None:
+        # the offset is ignored when a cursor is given
+        parameters["offset"] = None
+    return "user-list:" + json.dumps(
+        [user_write_generation.value, sorted(parameters.items())], default=str
+    )
+
+
 class UserService:
 
+    async def _invalidate(self, *user_ids: UUID):
+        """
+        Drops the given users from the user cache and bumps the write generation,
+        which retires the cached pages and counts. Called once the write is
+        committed. A read that started before and ends after it sees the generation
+        change and does not cache the row it loaded, see cacheable.
+        :param user_ids: The IDs of the written users
+        """
+        await user_cache.delete(*(user_cache_key(user_id) for user_id in user_ids))
+        user_write_generation.bump()
+
     # def get_user_by_id(self, user_id: UUID, db_obj: Session):
     #     """
     #     Service function to get a user by ID
@@ -25,13 +116,79 @@ class UserService:
     @transaction
     async def get_user_by_id(self, user_id: UUID, db_obj: AsyncSession):
         """
-        Service function to get a user by ID asynchronously.
+        Service function to get a user by ID asynchronously. Users are served
+        from the user cache when present, the session is only used on a miss.
         :param db_obj: The session object
         :param user_id: The ID of the user to retrieve
-        :return: User object or None
+        :return: User object (DTO)
         """
-        result = await UserDAO.get_user(user_id=user_id, db_obj=db_obj)
-        return result
+        user = await self.load_user_by_id(user_id=user_id, db_obj=db_obj)
+        if user is None:
+            raise UserNotFound()
+        return user
+
+    @transaction
+    async def get_users_by_ids(self, user_ids: List[UUID], db_obj: AsyncSession):
+        """
+        Service function to get many users by ID asynchronously, the ones missing
+        from the user cache are read with one query.
+        :param db_obj: The session object
+        :param user_ids: The IDs of the users to retrieve
+        :return: List of User objects (DTO) in the order of user_ids, without the missing users
+        """
+        if len(user_ids) > BATCH_GET_MAX_IDS:
+            raise BulkSizeExceeded(BATCH_GET_MAX_IDS)
+        # a repeated id is loaded once and repeated in the response
+        unique_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(
+            *(
+                self.load_user_by_id(user_id=user_id, db_obj=db_obj)
+                for user_id in unique_ids
+            )
+        )
+        users_by_id = dict(zip(unique_ids, users))
+        return [
+            users_by_id[user_id]
+            for user_id in user_ids
+            if users_by_id[user_id] is not None
+        ]
+
+    def cacheable(self, generation: int) -> bool:
+        """
+        Tells whether a user, page or count read since the given write generation
+        can be cached.
+        :param generation: The write generation read before the read started
+        :return: False when a write was committed during the load, or lately with replicas
+        """
+        if user_write_generation.value != generation:
+            return False
+        return not (
+            settings.DATABASE_REPLICA_URLS
+            and user_write_generation.bumped_within(
+                settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+            )
+        )
+
+    async def load_user_by_id(self, user_id: UUID, db_obj: AsyncSession):
+        """
+        Loads a user from the user cache, or through the UserLoader of the session.
+        Concurrent calls on one session, e.g. gathered, share a single query. It does
+        not end the transaction, the caller does.
+        The loaded user is not cached when a write was committed while it loaded, as
+        it may be the row from before the write, nor shortly after any write when it
+        may come from a lagging replica.
+        :param db_obj: The session object
+        :param user_id: The ID of the user to retrieve
+        :return: User object (DTO) or None when it does not exist
+        """
+        cache_key = user_cache_key(user_id)
+        user = await user_cache.get(cache_key)
+        if user is None:
+            generation = user_write_generation.value
+            user = await UserLoader.for_session(db_obj).load(user_id)
+            if user is not None and self.cacheable(generation):
+                await user_cache.set(cache_key, user)
+        return user
 
     # def create_user_details(self, user_create: UserCreate, db_obj: Session):
     #     """
@@ -53,17 +210,64 @@ class UserService:
     @transaction
     async def create_user_details(self, user_create: UserCreate, db_obj: AsyncSession):
         """
-        Service function to create a new user asynchronously.
+        Service function to create a new user asynchronously, in one
+        INSERT ... RETURNING round-trip, committed before the cached pages are retired.
         :param db_obj: The session object
         :param user_create: The user creation DTO
         :return: Created User object (DTO)
         """
-        user_db = Converter.user_create_dto_to_db(user_create)
-        db_obj.add(user_db)
+        user_db = await UserDAO.create_user(
+            db_obj=db_obj, user=Converter.user_create_dto_to_dict(user_create)
+        )
         await db_obj.commit()
-        await db_obj.refresh(user_db)
+        await self._invalidate()
         return Converter.user_db_to_dto(user_db)
 
+    @transaction
+    async def create_users_bulk(self, users: List[dict], db_obj: AsyncSession):
+        """
+        Service function to create many users asynchronously. Every user is
+        validated on its own, against UserCreate and the column types, the valid
+        ones are inserted in chunks and the invalid ones are reported by position
+        without failing the others.
+        :param db_obj: The session object
+        :param users: The raw user creation payloads
+        :return: UserBulkCreateResponse with the created users and the errors
+        """
+        if len(users) > BULK_MAX_ITEMS:
+            raise BulkSizeExceeded(BULK_MAX_ITEMS)
+
+        rows, errors = [], []
+        for index, user in enumerate(users):
+            try:
+                user_create = UserCreate.model_validate(user)
+            except ValidationError as validation_error:
+                errors.append(
+                    UserBulkError(
+                        index=index,
+                        errors=validation_error.errors(
+                            include_url=False, include_context=False
+                        ),
+                    )
+                )
+                continue
+            values = Converter.user_create_dto_to_dict(user_create)
+            # a value not fitting its column would fail the INSERT of the whole chunk
+            value_errors = column_errors(values)
+            if value_errors:
+                errors.append(UserBulkError(index=index, errors=value_errors))
+                continue
+            rows.append(values)
+
+        created_users = await UserDAO.bulk_create_users(db_obj=db_obj, users=rows)
+        if created_users:
+            await db_obj.commit()
+            await self._invalidate()
+        return UserBulkCreateResponse.model_construct(
+            created=[Converter.user_db_to_dto(user) for user in created_users],
+            errors=errors,
+        )
+
     # def update_existing_user(
     #     self, user_id: UUID, user_update: UserUpdate, db_obj: Session
     # ):
@@ -91,19 +295,20 @@ class UserService:
         self, user_id: UUID, user_update: UserUpdate, db_obj: AsyncSession
     ):
         """
-        Service function to update an existing user asynchronously.
+        Service function to update an existing user asynchronously, in one
+        UPDATE ... RETURNING round-trip, committed before the user cache is invalidated.
         :param db_obj: The session object
         :param user_id: The ID of the user to update
         :param user_update: The user update DTO
-        :return: Updated User object (DTO) or None
+        :return: Updated User object (DTO)
         """
-        user_db = await UserDAO.get_user(user_id=user_id, db_obj=db_obj)
-        if not user_db:
-            return None
-
-        updated_user = Converter.user_update_dto_to_db(user_update, user_db)
+        updated_user = await UserDAO.update_user(
+            db_obj=db_obj, user_id=user_id, user=user_update
+        )
+        if not updated_user:
+            raise UserNotFound()
         await db_obj.commit()
-        await db_obj.refresh(updated_user)
+        await self._invalidate(user_id)
         return Converter.user_db_to_dto(updated_user)
 
     # def delete_existing_user(self, user_id: UUID, db_obj: Session):
@@ -127,14 +332,15 @@ class UserService:
     @transaction
     async def delete_existing_user(self, user_id: UUID, db_obj: AsyncSession):
         """
-        Service function to delete a user asynchronously.
+        Service function to delete a user asynchronously, in one DELETE ... RETURNING round-trip.
         :param db_obj: The session object
         :param user_id: The ID of the user to delete
         :return: Dictionary with success status
         """
-        user_db = await UserDAO.get_user(user_id=user_id, db_obj=db_obj)
-        if user_db:
-            await db_obj.delete(user_db)
+        deleted_id = await UserDAO.delete_user(db_obj=db_obj, user_id=user_id)
+        if deleted_id:
+            await db_obj.commit()
+            await self._invalidate(user_id)
             return {"status": "Success"}
         return {"status": f"User {user_id} not found."}
 
@@ -169,21 +375,121 @@ class UserService:
         sort_order: Optional[str] = "asc",
         limit: Optional[int] = 10,
         offset: Optional[int] = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        count: CountMode = CountMode.NONE,
     ):
         """
-        Service function to get all users asynchronously.
+        Service function to get all users asynchronously. Pages are cached until the
+        next user write, and concurrent identical requests missing the cache share
+        one read. A page is not cached when a write was committed while it was read,
+        or lately with replicas, see cacheable.
         :param db_obj: The session object
-        :return: List of User DTOs
+        :param cursor: Opaque cursor of the page to fetch, replaces offset when given
+        :param fields: Names of the UserResponse fields to load, None for every field
+        :param count: How to count the users matching the search
+        :return: UserListPage with the User DTOs, the next_cursor and the total
         """
-        users = await UserDAO.all_user(
+        parameters = dict(
+            search=search,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            fields=fields,
+            count=count,
+        )
+        generation = user_write_generation.value
+        cache_key = user_list_cache_key(**parameters)
+        page = await user_list_cache.get(cache_key)
+        if page is not None:
+            return page
+
+        async def read_page():
+            page = await self.read_users_page(db_obj=db_obj, **parameters)
+            if self.cacheable(generation):
+                await user_list_cache.set(cache_key, page)
+            return page
+
+        return await user_list_flight.do(cache_key, read_page)
+
+    async def read_users_page(
+        self,
+        db_obj: AsyncSession,
+        search: Optional[str] = None,
+        sort_by: Optional[str] = "created_at",
+        sort_order: Optional[str] = "asc",
+        limit: Optional[int] = 10,
+        offset: Optional[int] = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        count: CountMode = CountMode.NONE,
+    ):
+        """
+        Service function reading a page of users from the database, bypassing the cache.
+        :param db_obj: The session object
+        :return: UserListPage with the User DTOs, the next_cursor and the total
+        """
+        users, next_cursor = await UserDAO.all_user(
             db_obj=db_obj,
             search=search,
             sort_by=sort_by,
             sort_order=sort_order,
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            fields=fields,
+        )
+        total = None
+        if count == CountMode.EXACT:
+            total = await self.count_users(db_obj=db_obj, search=search)
+        elif count == CountMode.ESTIMATED:
+            total = await UserDAO.estimate_users(db_obj=db_obj, search=search)
+        return UserListPage.model_construct(
+            items=Converter.user_rows_to_dtos(users),
+            next_cursor=next_cursor,
+            total=total,
         )
-        return [Converter.user_db_to_dto(user) for user in users]
+
+    async def count_users(self, db_obj: AsyncSession, search: Optional[str] = None):
+        """
+        Service function to count the users matching a search exactly. Counts are
+        cached until the next user write, for at most USER_COUNT_CACHE_TTL_SECONDS,
+        so a pager does not pay for a full count on every page. Like the pages, a
+        count is not cached when it may predate a write, see cacheable.
+        :param db_obj: The session object
+        :param search: Used to searching
+        :return: The number of matching users
+        """
+        generation = user_write_generation.value
+        cache_key = user_count_cache_key(search)
+        total = await user_count_cache.get(cache_key)
+        if total is None:
+            total = await UserDAO.count_users(db_obj=db_obj, search=search)
+            if self.cacheable(generation):
+                await user_count_cache.set(cache_key, total)
+        return total
+
+    async def export_users(
+        self, export_format: ExportFormat, search: Optional[str] = None
+    ):
+        """
+        Service function streaming all the users, or the ones matching the search,
+        as NDJSON or CSV. It opens its own read session because the response body
+        is produced after the request dependencies are closed.
+        :param export_format: The output format
+        :param search: Used to searching
+        :return: Async iterator over encoded chunks, one per fetched batch of users
+        """
+        async with read_session() as db_obj:
+            if export_format == ExportFormat.CSV:
+                yield Converter.users_to_csv([], header=True)
+            async for users in UserDAO.stream_users(db_obj=db_obj, search=search):
+                if export_format == ExportFormat.CSV:
+                    yield Converter.users_to_csv(users)
+                else:
+                    yield Converter.users_to_ndjson(users)
 
     # def change_user_status(
     #     self, db_obj: Session, user_id: UUID, user_update_status: UserUpdateStatus
@@ -214,21 +520,71 @@ class UserService:
         self, db_obj: AsyncSession, user_id: UUID, user_update_status: UserUpdateStatus
     ):
         """
-        Service function to change the status of a user asynchronously.
+        Service function to change the status of a user asynchronously, in one
+        UPDATE ... RETURNING round-trip, committed before the user cache is invalidated.
         :param db_obj: The session object
         :param user_id: The ID of the user to update
         :param user_update_status: The status update schema from user dto
-        :return: Updat
+        :return: Updated User object (DTO)
         """
-        user_db = await UserDAO.get_user(user_id=user_id, db_obj=db_obj)
-        if user_db:
-            updated_user = Converter.user_update_status_dto_to_db(
-                user_update_status, user_db
-            )
-            await db_obj.commit()
-            await db_obj.refresh(updated_user)
-            return Converter.user_db_to_dto(updated_user)
-        return None
+        updated_user = await UserDAO.update_status(
+            db_obj=db_obj, user_id=user_id, new_status=user_update_status.status
+        )
+        if not updated_user:
+            raise UserNotFound()
+        await db_obj.commit()
+        await self._invalidate(user_id)
+        return Converter.user_db_to_dto(updated_user)
+
+    @transaction
+    async def change_users_status_bulk(
+        self, user_bulk_update_status: UserBulkUpdateStatus, db_obj: AsyncSession
+    ):
+        """
+        Service function to change the status of many users asynchronously.
+        The users are updated BULK_CHUNK_SIZE at a time and every chunk is
+        committed on its own to bound how long the row locks are held. A failure
+        keeps the chunks already committed, retrying the request is safe.
+        :param db_obj: The session object
+        :param user_bulk_update_status: The ids or the filter of the users and their new status
+        :return: Dictionary with the number of updated users
+        """
+        try:
+            new_status = Status(user_bulk_update_status.status)
+        except ValueError:
+            raise InvalidStatusAttribute(str(user_bulk_update_status.status))
+
+        updated = 0
+        if user_bulk_update_status.ids is not None:
+            user_ids = list(dict.fromkeys(user_bulk_update_status.ids))
+            if len(user_ids) > BULK_STATUS_MAX_IDS:
+                raise BulkSizeExceeded(BULK_STATUS_MAX_IDS)
+            for start in range(0, len(user_ids), BULK_CHUNK_SIZE):
+                updated_ids = await UserDAO.bulk_update_status(
+                    db_obj=db_obj,
+                    user_ids=user_ids[start : start + BULK_CHUNK_SIZE],
+                    new_status=new_status,
+                )
+                await db_obj.commit()
+                await self._invalidate(*updated_ids)
+                updated += len(updated_ids)
+        else:
+            status_filter = user_bulk_update_status.filter
+            while True:
+                updated_ids = await UserDAO.bulk_update_status_matching(
+                    db_obj=db_obj,
+                    new_status=new_status,
+                    current_status=status_filter.current_status,
+                    created_before=status_filter.created_before,
+                    created_after=status_filter.created_after,
+                    chunk_size=BULK_CHUNK_SIZE,
+                )
+                await db_obj.commit()
+                await self._invalidate(*updated_ids)
+                updated += len(updated_ids)
+                if len(updated_ids) < BULK_CHUNK_SIZE:
+                    break
+        return {"updated": updated}
 
 
 user_service = UserService()
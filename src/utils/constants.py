@@ -14,3 +14,45 @@ class Status(int, Enum):
     DISABLED = 0
     ENABLED = 1
     BLOCKED = 2
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class CountMode(str, Enum):
+    NONE = "none"
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+
+
+# Response header carrying the cursor of the next page of a listing
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Response header carrying the total number of users matching a listing
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Request header carrying the profiling secret, profiles the request when it matches
+PROFILE_HEADER = "X-Profile"
+
+# sort_by value ordering a search by relevance instead of by a column
+SEARCH_RELEVANCE_SORT = "relevance"
+
+# Users written per statement by the bulk operations, bounds statement size and lock duration
+BULK_CHUNK_SIZE = 1000
+
+# Maximum number of users accepted by one bulk request
+BULK_MAX_ITEMS = 10000
+
+# Maximum number of ids accepted by one multi-get of users
+BATCH_GET_MAX_IDS = 100
+
+# Maximum number of ids accepted by one bulk status change, larger cohorts use a filter
+BULK_STATUS_MAX_IDS = 100000
+
+# Rows fetched per round-trip by the server side cursor of the user export
+EXPORT_BATCH_SIZE = 1000
+
+# Validated rows sent per COPY by the user import
+IMPORT_BATCH_SIZE = 5000
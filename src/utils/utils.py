@@ -1,4 +1,11 @@
+import base64
+import binascii
+import hashlib
+import json
 import uuid
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
 
 
 def generate_random_uuid():
@@ -10,3 +17,118 @@ def generate_random_uuid():
     """
     random_uuid = uuid.uuid4()
     return str(random_uuid)
+
+
+def encode_cursor(payload: dict):
+    """
+    Encode a pagination cursor into an opaque url-safe token.
+
+    Args:
+        payload (dict): JSON serialisable position of the last returned row.
+
+    Returns:
+        str: Opaque cursor token.
+    """
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a token produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor token.
+
+    Returns:
+        dict: The decoded cursor payload.
+
+    Raises:
+        ValueError: If the token is not a valid cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError("Malformed cursor") from error
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
+
+
+def escape_like(value: str):
+    """
+    Escape the LIKE wildcards of a user supplied value, using backslash as escape character.
+
+    Args:
+        value (str): Raw value.
+
+    Returns:
+        str: Value matching itself literally in a LIKE pattern.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values identifying a representation.
+
+    Args:
+        *parts: Values that change whenever the representation changes.
+
+    Returns:
+        str: Quoted ETag header value.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value: datetime):
+    """
+    Format a timezone aware datetime as an HTTP date, e.g. for Last-Modified.
+
+    Args:
+        value (datetime): Timezone aware datetime.
+
+    Returns:
+        str: The IMF-fixdate in GMT.
+    """
+    return format_datetime(value, usegmt=True)
+
+
+def is_not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: Optional[datetime] = None
+):
+    """
+    Evaluate the If-None-Match and If-Modified-Since preconditions of a GET request.
+    If-None-Match takes precedence, If-Modified-Since is only used without it.
+
+    Args:
+        headers (Mapping[str, str]): Request headers.
+        etag (str): Current ETag of the representation.
+        last_modified (Optional[datetime]): Current modification time, if any.
+
+    Returns:
+        bool: True when the client copy is current and a 304 can be sent.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # weak comparison, as required for If-None-Match
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have a one second resolution
+    return last_modified.replace(microsecond=0) <= since
@@ -0,0 +1,117 @@
+import asyncio
+
+from src.service.cache import LRUTTLCache, SingleFlight
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        # reading a makes b the least recently used entry
+        assert await cache.get("a") == 1
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_setting_an_entry_again_refreshes_it():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.set("a", 10)
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [10, None, 3]
+
+
+def test_expired_entry_is_dropped():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=0)
+
+    async def scenario():
+        await cache.set("a", 1)
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_entry_is_served_until_it_expires():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("a", 1)
+        return await cache.get("a"), await cache.get("missing")
+
+    assert asyncio.run(scenario()) == (1, None)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_concurrent_calls_of_a_key_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def load(key):
+            calls.append(key)
+            await release.wait()
+            return f"value of {key}"
+
+        tasks = [
+            asyncio.create_task(flight.do(key, lambda key=key: load(key)))
+            for key in ("a", "a", "a", "b")
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == ["value of a"] * 3 + ["value of b"]
+    assert calls == ["a", "b"]
+    assert flight.coalesced == 2
+
+
+def test_exception_of_the_call_reaches_every_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def fail():
+            calls.append(1)
+            await release.wait()
+            raise RuntimeError("database is down")
+
+        tasks = [asyncio.create_task(flight.do("a", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_key_is_called_again_once_the_call_is_done():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return await flight.do("a", load), await flight.do("a", load)
+
+    assert asyncio.run(scenario()) == (1, 2)
+    assert flight.coalesced == 0
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from src.dao.models.user import User
+from src.exceptions.user import InvalidFieldsAttribute
+from src.service.converter import Converter
+
+USER_ID = UUID("8ac1e2c3-e5c3-4214-9e95-cc6a96917969")
+
+
+def make_user(**values):
+    return User(
+        **{
+            "id": USER_ID,
+            "first_name": "ada",
+            "last_name": "lovelace",
+            "gender": 1,
+            "email": "ada@example.com",
+            "phone_number": None,
+            "status": 1,
+            "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+            "updated_at": datetime(2025, 1, 2, 3, 4, 5, 6789),
+            **values,
+        }
+    )
+
+
+def test_users_to_csv_writes_the_header_and_the_json_formatted_values():
+    csv = Converter.users_to_csv([], header=True) + Converter.users_to_csv(
+        [make_user()]
+    )
+
+    assert csv.splitlines() == [
+        "id,firstName,lastName,gender,email,phoneNumber,status,createdAt,updatedAt",
+        f"{USER_ID},ada,lovelace,1,ada@example.com,,1,"
+        "2025-01-01T00:00:00Z,2025-01-02T03:04:05.006789",
+    ]
+
+
+def test_users_to_csv_does_not_validate_the_rows():
+    csv = Converter.users_to_csv([make_user(email=None)])
+
+    assert csv.split(",")[4] == ""
+
+
+@pytest.mark.parametrize("fields", [None, "", "  "])
+def test_parse_fields_without_fields_selects_every_field(fields):
+    assert Converter.parse_fields(fields) is None
+
+
+def test_parse_fields_accepts_aliases_and_names_in_response_order():
+    assert Converter.parse_fields(" status, firstName,id,first_name,") == (
+        "id",
+        "first_name",
+        "status",
+    )
+
+
+def test_parse_fields_rejects_unknown_fields():
+    with pytest.raises(InvalidFieldsAttribute):
+        Converter.parse_fields("id,password")
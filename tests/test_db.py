@@ -0,0 +1,338 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.dao import db as db_module
+from src.dao.db import (
+    Database,
+    ReplicaRouter,
+    pool_sizes,
+    read_session,
+    settings,
+    warm_up_engine,
+)
+
+
+@pytest.mark.parametrize(
+    "workers, pool_size, max_overflow, expected",
+    [
+        (0, 5, 10, (5, 10)),
+        (1, 5, 10, (5, 10)),
+        (2, 5, 10, (2, 5)),
+        (4, 20, 10, (5, 2)),
+        (5, 5, 10, (1, 2)),
+        # more workers than the budget still keep one connection each
+        (8, 5, 3, (1, 0)),
+    ],
+)
+def test_pool_is_divided_between_the_workers(
+    monkeypatch, workers, pool_size, max_overflow, expected
+):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", workers)
+    monkeypatch.setattr(settings, "DATABASE_POOL_SIZE", pool_size)
+    monkeypatch.setattr(settings, "DATABASE_MAX_OVERFLOW", max_overflow)
+
+    assert pool_sizes() == expected
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 4, 5])
+def test_workers_stay_within_the_budget(monkeypatch, workers):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", workers)
+    monkeypatch.setattr(settings, "DATABASE_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "DATABASE_MAX_OVERFLOW", 10)
+
+    pool_size, max_overflow = pool_sizes()
+
+    assert workers * pool_size <= 5
+    assert workers * (pool_size + max_overflow) <= 15
+
+
+class FakeClock:
+    """Stand-in of the time module of src.dao.db, moved forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(db_module, "time", fake_clock)
+    return fake_clock
+
+
+def test_replicas_are_tried_in_turn():
+    router = ReplicaRouter([object(), object(), object()], retry_interval=30)
+
+    assert [router.candidates() for _ in range(4)] == [
+        [0, 1, 2],
+        [1, 2, 0],
+        [2, 0, 1],
+        [0, 1, 2],
+    ]
+
+
+def test_unhealthy_replica_is_skipped_until_its_retry_interval_elapsed(clock):
+    router = ReplicaRouter([object(), object(), object()], retry_interval=30)
+
+    router.mark_unhealthy(1)
+    assert router.candidates() == [0, 2]
+    assert router.candidates() == [2, 0]
+
+    clock.now += 29
+    assert router.candidates() == [2, 0]
+
+    clock.now += 1
+    assert router.candidates() == [0, 1, 2]
+
+
+def test_without_replicas_there_is_no_candidate():
+    assert ReplicaRouter([], retry_interval=30).candidates() == []
+
+
+class FakeSession:
+    """AsyncSession stand-in whose connection checkout may fail"""
+
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.closed = False
+
+    async def connection(self):
+        if self.error is not None:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class FakeDatabase:
+    """Database stand-in handing out FakeSessions from its primary and replicas"""
+
+    def __init__(self, *replica_errors):
+        self.sessions = []
+        self.replica_router = ReplicaRouter(
+            [
+                lambda index=index, error=error: self.open(f"replica-{index}", error)
+                for index, error in enumerate(replica_errors)
+            ],
+            retry_interval=30,
+        )
+
+    def open(self, name, error=None):
+        session = FakeSession(name, error)
+        self.sessions.append(session)
+        return session
+
+    def session_factory(self):
+        return self.open("primary")
+
+
+def read_with(monkeypatch, fake_database):
+    """The name of the session read_session yields, which is closed afterwards"""
+    monkeypatch.setattr(db_module, "database", fake_database)
+
+    async def scenario():
+        async with read_session() as session:
+            assert not session.closed
+            return session
+
+    session = asyncio.run(scenario())
+    assert session.closed
+    return session.name
+
+
+def test_reads_go_to_the_replicas_in_turn(monkeypatch, clock):
+    fake_database = FakeDatabase(None, None)
+
+    names = [read_with(monkeypatch, fake_database) for _ in range(3)]
+
+    assert names == ["replica-0", "replica-1", "replica-0"]
+
+
+def test_unreachable_replica_is_skipped(monkeypatch, clock, caplog):
+    fake_database = FakeDatabase(OSError("connection refused"), None)
+
+    with caplog.at_level(logging.WARNING, logger=db_module.__name__):
+        assert read_with(monkeypatch, fake_database) == "replica-1"
+    assert "Read replica 0 is unavailable" in caplog.text
+    # the failed session is closed and the replica left out of the next turns
+    assert [session.closed for session in fake_database.sessions] == [True, True]
+    assert fake_database.replica_router.candidates() == [1]
+
+
+def test_reads_fall_back_to_the_primary_when_every_replica_fails(monkeypatch, clock):
+    fake_database = FakeDatabase(
+        OSError("connection refused"), SQLAlchemyError("pool timeout")
+    )
+
+    assert read_with(monkeypatch, fake_database) == "primary"
+    assert [session.name for session in fake_database.sessions] == [
+        "replica-0",
+        "replica-1",
+        "primary",
+    ]
+    assert all(session.closed for session in fake_database.sessions)
+    assert fake_database.replica_router.candidates() == []
+
+
+def test_reads_use_the_primary_without_replicas(monkeypatch, clock):
+    assert read_with(monkeypatch, FakeDatabase()) == "primary"
+
+
+class StubConnection(AsyncConnection):
+    """AsyncConnection stand-in recording its return to the pool"""
+
+    def __init__(self):
+        self.returned = False
+
+    async def close(self):
+        self.returned = True
+
+
+class StubPool:
+    def __init__(self, size):
+        self._size = size
+
+    def size(self):
+        return self._size
+
+
+class StubEngine:
+    """AsyncEngine stand-in whose connect fails on the given calls"""
+
+    def __init__(self, pool_size=5, failing_calls=()):
+        self.pool = StubPool(pool_size)
+        self.failing_calls = set(failing_calls)
+        self.connections = []
+        self.disposed = False
+
+    async def connect(self):
+        if len(self.connections) in self.failing_calls:
+            self.connections.append(None)
+            raise OSError("connection refused")
+        connection = StubConnection()
+        self.connections.append(connection)
+        return connection
+
+    async def dispose(self):
+        self.disposed = True
+
+
+@pytest.fixture
+def prepared(monkeypatch):
+    """The connections the hot statements were prepared on"""
+    connections = []
+
+    async def prepare_statements(connection):
+        connections.append(connection)
+
+    monkeypatch.setattr(db_module, "prepare_statements", prepare_statements)
+    return connections
+
+
+def test_warm_up_opens_and_returns_the_connections(prepared):
+    engine = StubEngine(pool_size=5)
+
+    warm_up = asyncio.run(warm_up_engine("primary", engine, 3, prepare=True))
+
+    assert warm_up["name"] == "primary"
+    assert warm_up["connections"] == 3
+    assert prepared == engine.connections
+    assert all(connection.returned for connection in engine.connections)
+
+
+def test_warm_up_is_capped_at_the_pool_size(prepared):
+    engine = StubEngine(pool_size=2)
+
+    warm_up = asyncio.run(warm_up_engine("primary", engine, 5, prepare=False))
+
+    assert warm_up["connections"] == len(engine.connections) == 2
+    assert prepared == []
+
+
+def test_partial_warm_up_returns_the_opened_connections_and_warns(prepared, caplog):
+    engine = StubEngine(pool_size=5, failing_calls={1, 3})
+
+    with caplog.at_level(logging.WARNING, logger=db_module.__name__):
+        warm_up = asyncio.run(warm_up_engine("replica-0", engine, 4, prepare=True))
+
+    opened = [connection for connection in engine.connections if connection]
+    assert warm_up["connections"] == len(opened) == 2
+    assert prepared == opened
+    assert all(connection.returned for connection in opened)
+    [record] = caplog.records
+    assert record.getMessage() == (
+        "Warm-up of replica-0 incomplete, 2 of 4 connections opened: "
+        "connection refused"
+    )
+
+
+def test_failed_statement_preparation_is_reported(monkeypatch, caplog):
+    async def prepare_statements(connection):
+        raise RuntimeError("relation user does not exist")
+
+    monkeypatch.setattr(db_module, "prepare_statements", prepare_statements)
+    engine = StubEngine(pool_size=5)
+
+    with caplog.at_level(logging.WARNING, logger=db_module.__name__):
+        warm_up = asyncio.run(warm_up_engine("primary", engine, 2, prepare=True))
+
+    assert warm_up["connections"] == 2
+    assert all(connection.returned for connection in engine.connections)
+    assert "relation user does not exist" in caplog.text
+
+
+def test_database_warms_up_every_engine_and_disposes_them(
+    monkeypatch, prepared, caplog
+):
+    engines = {}
+
+    def create_engine_from_settings(url, name="primary"):
+        engine = engines[name] = StubEngine(pool_size=5)
+        return engine
+
+    monkeypatch.setattr(
+        db_module, "create_engine_from_settings", create_engine_from_settings
+    )
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", "postgresql+asyncpg://r")
+    monkeypatch.setattr(settings, "DATABASE_WARMUP_CONNECTIONS", 2)
+    monkeypatch.setattr(settings, "DATABASE_WARMUP_PREPARE_STATEMENTS", True)
+    database = Database()
+
+    async def scenario():
+        await database.start()
+        assert database.engine is engines["primary"]
+        assert database.replica_engines == [engines["replica-0"]]
+        await database.close()
+        # closing twice is harmless
+        await database.close()
+
+    with caplog.at_level(logging.INFO, logger=db_module.__name__):
+        asyncio.run(scenario())
+
+    assert [len(engine.connections) for engine in engines.values()] == [2, 2]
+    assert len(prepared) == 4
+    assert all(engine.disposed for engine in engines.values())
+    assert database._engine is None and database._replica_engines == []
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[0].startswith("Database ready in ")
+    assert "primary 2 connections" in messages[0]
+    assert "replica-0 2 connections" in messages[0]
+    assert messages[1].startswith("Database engines disposed in ")
+    assert len(messages) == 2
@@ -0,0 +1,45 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from src.dao.instrumentation import redact_parameters, statement_operation
+
+
+@pytest.mark.parametrize(
+    "statement, operation",
+    [
+        ("SELECT 1", "SELECT"),
+        ("  insert INTO user", "INSERT"),
+        ("WITH matching AS (...) UPDATE", "WITH"),
+        ("COPY user FROM STDIN", "OTHER"),
+    ],
+)
+def test_statement_operation(statement, operation):
+    assert statement_operation(statement) == operation
+
+
+def test_named_parameters_are_replaced_by_their_types():
+    parameters = {"email": "ada@example.com", "id": uuid4(), "limit": 10, "x": None}
+
+    assert redact_parameters(parameters, executemany=False) == {
+        "email": "str",
+        "id": "UUID",
+        "limit": "int",
+        "x": "NoneType",
+    }
+
+
+def test_positional_parameters_are_replaced_by_their_types():
+    parameters = ("ada@example.com", datetime(2025, 1, 1))
+
+    assert redact_parameters(parameters, executemany=False) == ["str", "datetime"]
+    assert redact_parameters(None, executemany=False) == []
+
+
+def test_parameter_sets_are_only_counted():
+    parameters = [{"email": "ada@example.com"}, {"email": "bob@example.com"}]
+
+    redacted = redact_parameters(parameters, executemany=True)
+
+    assert redacted == "<2 parameter sets>"
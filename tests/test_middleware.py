@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import pstats
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.http_load import STATEMENTS
+from src.core import middleware as middleware_module
+from src.core.metrics import Gauge, Histogram, Registry
+from src.core.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestTimingMiddleware,
+)
+from src.dao.instrumentation import account_statement
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(\d+\.\d);desc="(\d+) statements", app;dur=\d+\.\d$'
+)
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Fresh request metrics, the ones of the module outlive the tests"""
+    registry = Registry()
+    in_flight = Gauge("in_flight", "", ("method",), registry=registry)
+    duration = Histogram(
+        "duration", "", ("method", "route", "status"), registry=registry
+    )
+    monkeypatch.setattr(middleware_module, "HTTP_REQUESTS_IN_FLIGHT", in_flight)
+    monkeypatch.setattr(middleware_module, "HTTP_REQUEST_DURATION", duration)
+    return in_flight, duration
+
+
+def metrics_app(in_flight):
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int):
+        return {"in_flight": in_flight._values[("GET",)]}
+
+    @app.get("/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def test_requests_are_labelled_by_route_template(metrics):
+    in_flight, duration = metrics
+    client = TestClient(metrics_app(in_flight), raise_server_exceptions=False)
+
+    assert client.get("/users/1").json() == {"in_flight": 1}
+    client.get("/users/2")
+    client.post("/users/2")
+    client.get("/users/not-a-number")
+    client.get("/missing")
+    client.get("/fail")
+
+    assert {
+        labels: sum(series[:-1]) for labels, series in duration._values.items()
+    } == {
+        ("GET", "/users/{user_id}", "200"): 2,
+        ("POST", "/users/{user_id}", "405"): 1,
+        ("GET", "/users/{user_id}", "422"): 1,
+        ("GET", "unmatched", "404"): 1,
+        ("GET", "/fail", "500"): 1,
+    }
+    assert in_flight._values == {("GET",): 0, ("POST",): 0}
+
+
+def statements_app(statements: int):
+    """ASGI app accounting the given number of 2.5ms statements to its request"""
+
+    async def app(scope, receive, send):
+        for _ in range(statements):
+            account_statement(0.0025)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+@pytest.fixture
+def timing_settings(monkeypatch):
+    monkeypatch.setattr(middleware_module.settings, "SERVER_TIMING_ENABLED", True)
+    monkeypatch.setattr(
+        middleware_module.settings, "REQUEST_STATEMENT_WARN_THRESHOLD", 2
+    )
+
+
+def test_server_timing_reports_the_statements_of_the_request(timing_settings, caplog):
+    client = TestClient(RequestTimingMiddleware(statements_app(2)))
+
+    with caplog.at_level(logging.WARNING, logger=middleware_module.__name__):
+        server_timing = client.get("/users").headers["server-timing"]
+
+    assert SERVER_TIMING.match(server_timing).groups() == ("5.0", "2")
+    # the load test reads the statements with this pattern
+    assert STATEMENTS.search(server_timing).group(1) == "2"
+    assert caplog.records == []
+
+
+def test_requests_running_too_many_statements_are_logged(timing_settings, caplog):
+    client = TestClient(RequestTimingMiddleware(statements_app(3)))
+
+    with caplog.at_level(logging.WARNING, logger=middleware_module.__name__):
+        server_timing = client.get("/users").headers["server-timing"]
+
+    assert SERVER_TIMING.match(server_timing).groups() == ("7.5", "3")
+    [record] = caplog.records
+    assert record.levelno == logging.WARNING
+    assert record.getMessage() == "GET /users ran 3 statements in 7.5ms, more than 2"
+
+
+def test_server_timing_can_be_disabled(timing_settings, monkeypatch):
+    monkeypatch.setattr(middleware_module.settings, "SERVER_TIMING_ENABLED", False)
+    client = TestClient(RequestTimingMiddleware(statements_app(1)))
+
+    assert "server-timing" not in client.get("/users").headers
+
+
+@pytest.fixture
+def profiling_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(middleware_module.settings, "PROFILING_HEADER_SECRET", "s3cret")
+    monkeypatch.setattr(middleware_module.settings, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(
+        middleware_module.settings, "PROFILING_OUTPUT_DIR", str(tmp_path)
+    )
+    return tmp_path
+
+
+def http_scope(*headers):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/users/1",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+
+
+def profile(middleware, scope):
+    """Runs a request through the middleware, the app answers right away"""
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+def test_request_sending_the_secret_is_profiled(profiling_settings):
+    middleware = ProfilingMiddleware(statements_app(0))
+
+    profile(middleware, http_scope(("X-Profile", "s3cret")))
+
+    [path] = profiling_settings.iterdir()
+    assert path.name.endswith("ms.pstats")
+    assert "-GET-users_1-" in path.name
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+@pytest.mark.parametrize(
+    "headers", [(), (("X-Profile", "wrong"),), (("X-Other", "s3cret"),)]
+)
+def test_request_without_the_secret_is_not_profiled(profiling_settings, headers):
+    middleware = ProfilingMiddleware(statements_app(0))
+
+    profile(middleware, http_scope(*headers))
+
+    assert list(profiling_settings.iterdir()) == []
+
+
+def test_empty_secret_disables_the_header(profiling_settings, monkeypatch):
+    monkeypatch.setattr(middleware_module.settings, "PROFILING_HEADER_SECRET", "")
+    middleware = ProfilingMiddleware(statements_app(0))
+
+    profile(middleware, http_scope(("X-Profile", "")))
+
+    assert list(profiling_settings.iterdir()) == []
+
+
+def test_sampled_request_is_profiled(profiling_settings, monkeypatch):
+    monkeypatch.setattr(middleware_module.settings, "PROFILING_SAMPLE_RATE", 1.0)
+    middleware = ProfilingMiddleware(statements_app(0))
+
+    profile(middleware, http_scope())
+
+    assert len(list(profiling_settings.iterdir())) == 1
+
+
+def test_one_request_is_profiled_at_a_time(profiling_settings):
+    release = None
+    requests = []
+
+    async def app(scope, receive, send):
+        requests.append(scope)
+        await release.wait()
+
+    middleware = ProfilingMiddleware(app)
+    scope = http_scope(("X-Profile", "s3cret"))
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(middleware(dict(scope), None, None))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(middleware(dict(scope), None, None))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+    assert len(requests) == 2
+    assert len(list(profiling_settings.iterdir())) == 1
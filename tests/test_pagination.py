@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.dao.models.user import User
+from src.dao.users import UserDAO
+from src.exceptions.user import InvalidCursor
+from src.utils.utils import decode_cursor, encode_cursor
+
+LAST_USER = User(
+    id=UUID("8ac1e2c3-e5c3-4214-9e95-cc6a96917969"),
+    first_name="ada",
+    created_at=datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc),
+)
+
+
+def seek(sort_by, sort_order, cursor):
+    """The compiled keyset predicate of the page following the cursor"""
+    condition = UserDAO.keyset_condition(
+        sort_by, sort_order, UserDAO.sort_column(sort_by), cursor
+    )
+    compiled = condition.compile(dialect=postgresql.dialect())
+    return str(compiled), list(compiled.params.values())
+
+
+def test_cursor_round_trip():
+    payload = {"s": "created_at", "o": "desc", "v": "2025-01-01", "id": "x"}
+    cursor = encode_cursor(payload)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == payload
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", encode_cursor([1, 2])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "sort_order, operator", [("asc", ">"), (None, ">"), ("desc", "<")]
+)
+def test_cursor_seeks_after_the_last_user(sort_order, operator):
+    cursor = UserDAO.encode_position("created_at", sort_order, LAST_USER)
+
+    statement, params = seek("created_at", sort_order, cursor)
+
+    assert f'("user".created_at, "user".id) {operator} (' in statement
+    assert params == [LAST_USER.created_at, LAST_USER.id]
+
+
+@pytest.mark.parametrize("sort_order, operator", [("asc", ">"), ("desc", "<")])
+def test_cursor_without_sort_column_seeks_on_id(sort_order, operator):
+    cursor = UserDAO.encode_position(None, sort_order, LAST_USER)
+
+    statement, params = seek(None, sort_order, cursor)
+
+    assert statement.startswith(f'"user".id {operator} ')
+    assert params == [LAST_USER.id]
+
+
+def test_cursor_keeps_text_sort_values():
+    cursor = UserDAO.encode_position("first_name", "asc", LAST_USER)
+
+    assert seek("first_name", "asc", cursor)[1] == ["ada", LAST_USER.id]
+
+
+@pytest.mark.parametrize(
+    "sort_by, sort_order",
+    [("created_at", "asc"), ("first_name", "desc"), (None, "desc")],
+)
+def test_cursor_of_another_sorting_is_rejected(sort_by, sort_order):
+    cursor = UserDAO.encode_position("created_at", "desc", LAST_USER)
+
+    with pytest.raises(InvalidCursor):
+        seek(sort_by, sort_order, cursor)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"s": "created_at", "o": "asc", "v": "yesterday", "id": str(LAST_USER.id)},
+        {"s": "created_at", "o": "asc", "v": "2025-01-01", "id": "not a uuid"},
+        {"s": "created_at", "o": "asc", "v": "2025-01-01"},
+        {"s": "gender", "o": "asc", "v": "one", "id": str(LAST_USER.id)},
+    ],
+)
+def test_tampered_cursor_is_rejected(payload):
+    with pytest.raises(InvalidCursor):
+        seek(payload["s"], "asc", encode_cursor(payload))
+
+
+def test_cursor_is_refused_on_nullable_sort_columns():
+    cursor = encode_cursor({"s": "email", "o": "asc", "v": "a", "id": "x"})
+
+    with pytest.raises(InvalidCursor):
+        seek("email", "asc", cursor)
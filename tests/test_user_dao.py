@@ -0,0 +1,88 @@
+import asyncio
+import json
+import re
+
+from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+from src.dao.users import UserDAO
+
+PLAN = [{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 42}}]
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """AsyncConnection stand-in recording the statements sent to the driver"""
+
+    dialect = dialect()
+
+    def __init__(self):
+        self.statements = []
+
+    async def exec_driver_sql(self, statement, parameters):
+        self.statements.append((statement, parameters))
+        # asyncpg returns json as text
+        return FakeResult(json.dumps(PLAN))
+
+
+class FakeSession:
+    """AsyncSession stand-in answering the reltuples of the user table"""
+
+    def __init__(self, reltuples):
+        self.reltuples = reltuples
+        self.bind = FakeConnection()
+
+    async def scalar(self, statement, parameters):
+        return self.reltuples
+
+    async def connection(self):
+        return self.bind
+
+
+def test_estimate_without_search_reads_reltuples():
+    session = FakeSession(reltuples=1234.0)
+
+    assert asyncio.run(UserDAO.estimate_users(db_obj=session, search="  ")) == 1234
+    assert session.bind.statements == []
+
+
+def test_estimate_of_a_never_analyzed_table_reads_the_plan():
+    session = FakeSession(reltuples=-1.0)
+
+    assert asyncio.run(UserDAO.estimate_users(db_obj=session)) == 42
+    [(statement, parameters)] = session.bind.statements
+    assert statement.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert parameters == ()
+
+
+def test_estimate_with_search_binds_the_parameters_of_the_placeholders():
+    session = FakeSession(reltuples=1234.0)
+
+    estimate = asyncio.run(UserDAO.estimate_users(db_obj=session, search=" ada_x o'k "))
+
+    assert estimate == 42
+    [(statement, parameters)] = session.bind.statements
+    placeholders = {int(number) for number in re.findall(r"\$(\d+)", statement)}
+    assert placeholders == set(range(1, len(parameters) + 1))
+
+    config, search = re.search(
+        r"websearch_to_tsquery\(\$(\d+)::\w+, \$(\d+)::\w+\)", statement
+    ).groups()
+    assert parameters[int(config) - 1] == "simple"
+    assert parameters[int(search) - 1] == "ada_x o'k"
+
+    patterns = re.findall(r'"user"\.(\w+) ILIKE \$(\d+)', statement)
+    assert [column for column, _ in patterns] == [
+        "first_name",
+        "last_name",
+        "email",
+        "phone_number",
+    ]
+    for _, number in patterns:
+        assert parameters[int(number) - 1] == "%ada\\_x o'k%"
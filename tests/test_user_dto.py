@@ -0,0 +1,21 @@
+import pytest
+from pydantic import ValidationError
+
+from src.dto.user import UserBulkUpdateStatus
+
+
+@pytest.mark.parametrize(
+    "status_filter",
+    [{}, {"all": False}, {"all": True, "currentStatus": 1}],
+)
+def test_bulk_status_filter_needs_criteria_or_all(status_filter):
+    with pytest.raises(ValidationError):
+        UserBulkUpdateStatus.model_validate({"status": 0, "filter": status_filter})
+
+
+@pytest.mark.parametrize(
+    "status_filter",
+    [{"all": True}, {"currentStatus": 1}, {"createdAfter": "2024-01-01T00:00:00"}],
+)
+def test_bulk_status_filter_with_criteria_or_all_is_valid(status_filter):
+    UserBulkUpdateStatus.model_validate({"status": 0, "filter": status_filter})
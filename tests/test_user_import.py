@@ -0,0 +1,184 @@
+import asyncio
+import io
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.dao.users import IMPORT_COLUMNS, UserDAO
+from src.service import user_import as user_import_module
+from src.service.user_import import import_users, read_rows, reject, validate_row
+from src.utils.constants import ExportFormat
+
+ADA = {"firstName": "ada", "lastName": "lovelace", "gender": 2, "email": "a@b.co"}
+
+
+def test_csv_empty_cells_are_missing_values():
+    source = io.StringIO(
+        "firstName,lastName,gender,email,phoneNumber\n"
+        "ada,lovelace,2,a@b.co,\n"
+        "bob,,1,,+100\n"
+    )
+
+    assert list(read_rows(source, ExportFormat.CSV)) == [
+        (
+            2,
+            {
+                "firstName": "ada",
+                "lastName": "lovelace",
+                "gender": "2",
+                "email": "a@b.co",
+                "phoneNumber": None,
+            },
+            None,
+        ),
+        (
+            3,
+            {
+                "firstName": "bob",
+                "lastName": None,
+                "gender": "1",
+                "email": None,
+                "phoneNumber": "+100",
+            },
+            None,
+        ),
+    ]
+
+
+def test_ndjson_lines_are_parsed_one_at_a_time():
+    source = io.StringIO(json.dumps(ADA) + "\n\n{not json\n[1, 2]\n")
+
+    rows = list(read_rows(source, ExportFormat.NDJSON))
+
+    assert rows[0] == (1, ADA, None)
+    # the blank line is skipped, the line numbers count it
+    line_number, row, error = rows[1]
+    assert (line_number, row) == (3, "{not json")
+    assert error.startswith("Expecting property name")
+    assert rows[2] == (4, [1, 2], "Expected a JSON object")
+    assert len(rows) == 3
+
+
+def test_valid_row_is_ordered_as_the_import_columns():
+    values = dict(zip(IMPORT_COLUMNS, validate_row(ADA)))
+
+    assert values["first_name"] == "ada"
+    assert values["gender"] == 2
+    assert values["phone_number"] is None
+    assert values["id"] is not None
+
+
+@pytest.mark.parametrize(
+    "row, location",
+    [
+        ({**ADA, "email": "not an email"}, ["email"]),
+        ({**ADA, "lastName": "x" * 513}, ["last_name"]),
+        ({**ADA, "gender": 10**12}, ["gender"]),
+        ({**ADA, "gender": -(2**31) - 1}, ["gender"]),
+    ],
+)
+def test_invalid_row_is_rejected_with_its_errors(row, location):
+    with pytest.raises(ValueError) as row_errors:
+        validate_row(row)
+
+    [error] = row_errors.value.args[0]
+    assert list(error["loc"]) == location
+
+
+def test_rejected_row_is_written_as_one_ndjson_line():
+    reject_file = io.StringIO()
+
+    reject(reject_file, 3, {"gender": 10**12}, [{"msg": "too big"}])
+    reject(reject_file, 4, "{not json", [{"msg": "Expecting value"}])
+
+    assert [json.loads(line) for line in reject_file.getvalue().splitlines()] == [
+        {"line": 3, "row": {"gender": 10**12}, "errors": [{"msg": "too big"}]},
+        {"line": 4, "row": "{not json", "errors": [{"msg": "Expecting value"}]},
+    ]
+
+
+class FakeDriverConnection:
+    """asyncpg connection stand-in, recording whether its transaction committed"""
+
+    def __init__(self):
+        self.committed = False
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+        self.committed = True
+
+
+class FakeConnection:
+    def __init__(self, driver_connection):
+        self.driver_connection = driver_connection
+
+    async def get_raw_connection(self):
+        return self
+
+
+class FakeEngine:
+    def __init__(self):
+        self.driver_connection = FakeDriverConnection()
+
+    @asynccontextmanager
+    async def connect(self):
+        yield FakeConnection(self.driver_connection)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.engine = FakeEngine()
+
+
+@pytest.fixture
+def copies(monkeypatch):
+    """The batches sent with COPY, merged into the user table at the end"""
+    batches = []
+
+    async def create_import_staging(connection):
+        pass
+
+    async def copy_into_import_staging(connection, records):
+        batches.append(records)
+
+    async def merge_import_staging(connection):
+        return sum(len(batch) for batch in batches)
+
+    for function in (
+        create_import_staging,
+        copy_into_import_staging,
+        merge_import_staging,
+    ):
+        monkeypatch.setattr(UserDAO, function.__name__, staticmethod(function))
+    return batches
+
+
+def test_import_copies_the_valid_rows_and_rejects_the_others(monkeypatch, copies):
+    fake_database = FakeDatabase()
+    monkeypatch.setattr(user_import_module, "database", fake_database)
+    lines = [
+        ADA,
+        {**ADA, "gender": 10**12},
+        {**ADA, "firstName": "bob"},
+        {**ADA, "firstName": "eve"},
+    ]
+    source = io.StringIO(
+        "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+    )
+    reject_file = io.StringIO()
+
+    result = asyncio.run(
+        import_users(source, ExportFormat.NDJSON, reject_file, batch_size=2)
+    )
+
+    assert result == {"imported": 3, "rejected": 2}
+    first_names = [[record[1] for record in batch] for batch in copies]
+    assert first_names == [["ada", "bob"], ["eve"]]
+    rejects = [json.loads(line) for line in reject_file.getvalue().splitlines()]
+    assert [(line["line"], line["errors"][0].get("loc")) for line in rejects] == [
+        (2, ["gender"]),
+        (5, None),
+    ]
+    assert fake_database.engine.driver_connection.committed
@@ -0,0 +1,108 @@
+import asyncio
+from collections import namedtuple
+from uuid import uuid4
+
+import pytest
+
+from src.dao.users import UserDAO
+from src.service.user_loader import UserLoader
+
+UserRow = namedtuple("UserRow", ["id", "last_name"])
+
+
+class FakeSession:
+    """AsyncSession stand-in holding the loader of the request"""
+
+    def __init__(self):
+        self.info = {}
+
+
+class Batches(list):
+    """The user ids of every SELECT, the rows come from users"""
+
+    def __init__(self):
+        super().__init__()
+        self.users = {}
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    batches = Batches()
+
+    async def get_users(db_obj, user_ids):
+        batches.append(user_ids)
+        await asyncio.sleep(0)
+        return [batches.users[key] for key in user_ids if key in batches.users]
+
+    monkeypatch.setattr(UserDAO, "get_users", staticmethod(get_users))
+    return batches
+
+
+def add_users(batches, count):
+    user_ids = [uuid4() for _ in range(count)]
+    for number, user_id in enumerate(user_ids):
+        batches.users[user_id] = UserRow(user_id, f"user {number}")
+    return user_ids
+
+
+def test_loads_of_the_same_tick_are_merged_into_one_batch(batches):
+    user_ids = add_users(batches, 3)
+    loader = UserLoader(FakeSession())
+
+    async def scenario():
+        return await asyncio.gather(*(loader.load(user_id) for user_id in user_ids))
+
+    users = asyncio.run(scenario())
+
+    assert [user.id for user in users] == user_ids
+    assert len(batches) == 1
+    assert set(batches[0]) == set(user_ids)
+
+
+def test_load_many_keeps_the_input_order_and_reports_missing_users(batches):
+    first, second = add_users(batches, 2)
+    missing = uuid4()
+    loader = UserLoader(FakeSession())
+
+    users = asyncio.run(loader.load_many([second, missing, first, second]))
+
+    assert [user and user.id for user in users] == [second, None, first, second]
+    # the duplicate id is fetched once
+    assert sorted(map(str, batches[0])) == sorted(map(str, [first, second, missing]))
+
+
+def test_loads_of_later_ticks_make_a_new_batch(batches):
+    first, second = add_users(batches, 2)
+    loader = UserLoader(FakeSession())
+
+    async def scenario():
+        return await loader.load(first), await loader.load(second)
+
+    users = asyncio.run(scenario())
+
+    assert [user.last_name for user in users] == ["user 0", "user 1"]
+    assert batches == [[first], [second]]
+
+
+def test_failed_batch_reaches_every_caller(monkeypatch):
+    async def get_users(db_obj, user_ids):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(UserDAO, "get_users", staticmethod(get_users))
+    loader = UserLoader(FakeSession())
+
+    async def scenario():
+        return await asyncio.gather(
+            loader.load(uuid4()), loader.load(uuid4()), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_session_keeps_one_loader():
+    session = FakeSession()
+
+    assert UserLoader.for_session(session) is UserLoader.for_session(session)
+    assert UserLoader.for_session(session) is not UserLoader.for_session(FakeSession())
@@ -0,0 +1,268 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from src.dto.user import UserResponse
+from src.service import user_service as user_service_module
+from src.dao.users import UserDAO
+from src.service.cache import LRUTTLCache
+from src.service.user_loader import UserLoader
+from src.service.user_service import (
+    user_cache_key,
+    user_count_cache_key,
+    user_service,
+)
+
+
+class BlockedLoader:
+    """UserLoader stand-in returning a row once released"""
+
+    def __init__(self, user):
+        self.user = user
+        self.release = asyncio.Event()
+
+    async def load(self, user_id):
+        await self.release.wait()
+        return self.user
+
+
+class FakeSession:
+    """AsyncSession stand-in for the services wrapped by transaction"""
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    cache = LRUTTLCache(max_size=10, ttl_seconds=60)
+    monkeypatch.setattr(user_service_module, "user_cache", cache)
+    return cache
+
+
+def use_loader(monkeypatch, loader):
+    monkeypatch.setattr(
+        UserLoader, "for_session", classmethod(lambda cls, db_obj: loader)
+    )
+
+
+def test_loaded_user_is_cached(monkeypatch, user_cache):
+    user_id = uuid4()
+    user = UserResponse.model_construct(id=user_id, last_name="old")
+    loader = BlockedLoader(user)
+    use_loader(monkeypatch, loader)
+
+    async def scenario():
+        loader.release.set()
+        assert await user_service.load_user_by_id(user_id, db_obj=None) is user
+        assert await user_cache.get(user_cache_key(user_id)) is user
+
+    asyncio.run(scenario())
+
+
+def test_user_read_before_a_concurrent_write_is_not_cached(monkeypatch, user_cache):
+    user_id = uuid4()
+    old_user = UserResponse.model_construct(id=user_id, last_name="old")
+    loader = BlockedLoader(old_user)
+    use_loader(monkeypatch, loader)
+
+    async def scenario():
+        read = asyncio.create_task(user_service.load_user_by_id(user_id, db_obj=None))
+        await asyncio.sleep(0)
+        # the write commits while the read is loading the old row
+        await user_service._invalidate(user_id)
+        loader.release.set()
+        assert await read is old_user
+        assert await user_cache.get(user_cache_key(user_id)) is None
+
+    asyncio.run(scenario())
+
+
+def test_user_read_from_replicas_right_after_a_write_is_not_cached(
+    monkeypatch, user_cache
+):
+    user_id = uuid4()
+    loader = BlockedLoader(UserResponse.model_construct(id=user_id, last_name="old"))
+    use_loader(monkeypatch, loader)
+    monkeypatch.setattr(
+        user_service_module.settings, "DATABASE_REPLICA_URLS", "postgresql+asyncpg://r"
+    )
+
+    async def scenario():
+        await user_service._invalidate(user_id)
+        loader.release.set()
+        await user_service.load_user_by_id(user_id, db_obj=None)
+        assert await user_cache.get(user_cache_key(user_id)) is None
+
+    asyncio.run(scenario())
+
+
+def test_bulk_create_reports_values_not_fitting_their_column(monkeypatch):
+    inserted = []
+
+    async def bulk_create_users(db_obj, users):
+        inserted.extend(users)
+        return []
+
+    monkeypatch.setattr(UserDAO, "bulk_create_users", staticmethod(bulk_create_users))
+    users = [
+        {"firstName": "ada", "lastName": "lovelace", "gender": 1, "email": "a@b.co"},
+        {"firstName": "x" * 513, "lastName": "long", "gender": 1, "email": "x@b.co"},
+        {"firstName": "big", "lastName": "int", "gender": 10**12, "email": "i@b.co"},
+        {"firstName": "low", "lastName": "int", "gender": -(2**31), "email": "l@b.co"},
+    ]
+
+    response = asyncio.run(
+        user_service.create_users_bulk(users=users, db_obj=FakeSession())
+    )
+
+    assert [row["first_name"] for row in inserted] == ["ada", "low"]
+    assert [(error.index, error.errors[0]["loc"]) for error in response.errors] == [
+        (1, ["first_name"]),
+        (2, ["gender"]),
+    ]
+
+
+def test_count_cache_key_ignores_case_and_surrounding_whitespace():
+    assert user_count_cache_key(" Smith ") == user_count_cache_key("smith")
+    assert user_count_cache_key(None) == user_count_cache_key("")
+
+
+def test_count_cache_key_keeps_inner_whitespace():
+    # ILIKE matches the inner whitespace literally
+    assert user_count_cache_key("ada  lovelace") != user_count_cache_key("ada lovelace")
+
+
+def test_batch_get_keeps_the_order_and_the_repeated_ids(monkeypatch, user_cache):
+    first, second, missing = uuid4(), uuid4(), uuid4()
+    users = {
+        user_id: UserResponse.model_construct(id=user_id) for user_id in (first, second)
+    }
+    loaded = []
+
+    async def load_user_by_id(user_id, db_obj):
+        loaded.append(user_id)
+        return users.get(user_id)
+
+    monkeypatch.setattr(user_service, "load_user_by_id", load_user_by_id)
+
+    result = asyncio.run(
+        user_service.get_users_by_ids(
+            [second, first, missing, second], db_obj=FakeSession()
+        )
+    )
+
+    assert [user.id for user in result] == [second, first, second]
+    assert sorted(loaded, key=str) == sorted([first, second, missing], key=str)
+
+
+@pytest.fixture
+def user_list_cache(monkeypatch):
+    cache = LRUTTLCache(max_size=10, ttl_seconds=60)
+    monkeypatch.setattr(user_service_module, "user_list_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def user_count_cache(monkeypatch):
+    cache = LRUTTLCache(max_size=10, ttl_seconds=60)
+    monkeypatch.setattr(user_service_module, "user_count_cache", cache)
+    return cache
+
+
+def use_page(monkeypatch, page):
+    async def read_users_page(db_obj, **parameters):
+        return page
+
+    monkeypatch.setattr(user_service, "read_users_page", read_users_page)
+
+
+def use_count(monkeypatch, total):
+    async def count_users(db_obj, search):
+        return total
+
+    monkeypatch.setattr(UserDAO, "count_users", staticmethod(count_users))
+
+
+def test_read_page_is_cached(monkeypatch, user_list_cache):
+    page = object()
+    use_page(monkeypatch, page)
+
+    async def scenario():
+        assert await user_service.get_all_users(db_obj=None) is page
+        assert user_list_cache.stats()["size"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_page_read_from_replicas_right_after_a_write_is_not_cached(
+    monkeypatch, user_cache, user_list_cache
+):
+    page = object()
+    use_page(monkeypatch, page)
+    monkeypatch.setattr(
+        user_service_module.settings, "DATABASE_REPLICA_URLS", "postgresql+asyncpg://r"
+    )
+
+    async def scenario():
+        await user_service._invalidate()
+        assert await user_service.get_all_users(db_obj=None) is page
+        assert user_list_cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_page_read_before_a_concurrent_write_is_not_cached(
+    monkeypatch, user_cache, user_list_cache
+):
+    release = asyncio.Event()
+
+    async def read_users_page(db_obj, **parameters):
+        await release.wait()
+        return "old page"
+
+    monkeypatch.setattr(user_service, "read_users_page", read_users_page)
+
+    async def scenario():
+        read = asyncio.create_task(user_service.get_all_users(db_obj=None))
+        await asyncio.sleep(0)
+        await user_service._invalidate()
+        release.set()
+        assert await read == "old page"
+        assert user_list_cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_count_read_from_replicas_right_after_a_write_is_not_cached(
+    monkeypatch, user_cache, user_count_cache
+):
+    use_count(monkeypatch, 42)
+    monkeypatch.setattr(
+        user_service_module.settings, "DATABASE_REPLICA_URLS", "postgresql+asyncpg://r"
+    )
+
+    async def scenario():
+        await user_service._invalidate()
+        assert await user_service.count_users(db_obj=None, search="ada") == 42
+        assert user_count_cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_count_is_cached_without_replicas(monkeypatch, user_cache, user_count_cache):
+    use_count(monkeypatch, 42)
+
+    async def scenario():
+        await user_service._invalidate()
+        assert await user_service.count_users(db_obj=None, search="ada") == 42
+        assert user_count_cache.stats()["size"] == 1
+
+    asyncio.run(scenario())
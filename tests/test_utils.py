@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.utils.utils import http_date, is_not_modified, make_etag
+
+LAST_MODIFIED = datetime(2025, 1, 1, 12, 30, 15, 500000, tzinfo=timezone.utc)
+
+
+def test_etag_is_quoted_and_stable():
+    etag = make_etag("user", 1, LAST_MODIFIED)
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("user", 1, LAST_MODIFIED)
+    assert etag != make_etag("user", 2, LAST_MODIFIED)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", "abc"', True),
+        ("*", True),
+        ('"other"', False),
+        ("", False),
+    ],
+)
+def test_if_none_match(if_none_match, expected):
+    headers = {"if-none-match": if_none_match}
+
+    assert is_not_modified(headers, '"abc"') is expected
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {
+        "if-none-match": '"other"',
+        "if-modified-since": http_date(LAST_MODIFIED),
+    }
+
+    assert not is_not_modified(headers, '"abc"', LAST_MODIFIED)
+
+
+@pytest.mark.parametrize(
+    "if_modified_since, expected",
+    [
+        # HTTP dates drop the microseconds of the modification time
+        (http_date(LAST_MODIFIED), True),
+        ("Wed, 01 Jan 2025 12:31:00 GMT", True),
+        ("Wed, 01 Jan 2025 12:30:14 GMT", False),
+        ("not a date", False),
+    ],
+)
+def test_if_modified_since(if_modified_since, expected):
+    headers = {"if-modified-since": if_modified_since}
+
+    assert is_not_modified(headers, '"abc"', LAST_MODIFIED) is expected
+
+
+def test_without_preconditions_the_representation_is_sent():
+    assert not is_not_modified({}, '"abc"', LAST_MODIFIED)
+    assert not is_not_modified({"if-modified-since": http_date(LAST_MODIFIED)}, '"abc"')